@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark rendering of Perfion product queries.
+
+Compares rendering with the precompiled template of `syncly.clients.perfion.query`
+against compiling the template source for every page, as the client used to do.
+
+Usage:
+    python scripts/benchmark_perfion_query.py --pages 1000
+"""
+
+import argparse
+import timeit
+from datetime import datetime
+
+from jinja2 import Environment
+
+from syncly.adapters.perfion.constants import PRODUCT_FEATURES
+from syncly.clients.perfion.query import (
+    PRODUCTS_QUERY,
+    ProductFilter,
+    product_clauses,
+    products_query,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Perfion query rendering")
+    parser.add_argument("--pages", type=int, default=1000, help="Queries rendered per run")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs, the fastest is reported")
+    args = parser.parse_args()
+
+    filters = ProductFilter(
+        categories=["Werkbroeken", "Jassen"],
+        excluded_item_numbers=["502001", "502002"],
+        modified_since=datetime.now(),
+    )
+    environment = Environment(autoescape=True)
+
+    def precompiled():
+        for index in range(args.pages):
+            products_query(index * 1000, 1000, features=PRODUCT_FEATURES, filters=filters)
+
+    def compiled_per_page():
+        for index in range(args.pages):
+            environment.from_string(PRODUCTS_QUERY).render(
+                index=index * 1000,
+                per_page=1000,
+                features=PRODUCT_FEATURES,
+                clauses=product_clauses(filters),
+            )
+
+    for name, func in (("precompiled", precompiled), ("compiled per page", compiled_per_page)):
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print(f"{name:>18}: {best * 1000:8.1f} ms for {args.pages} queries "
+              f"({best / args.pages * 1e6:.1f} us per query)")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ Data Loaded:
 1. Brands - All brands in the shop
 2. Packages - All package types
 3. Categories - All product categories
-4. Attributes - All product attributes and their values
+4. Attributes - All product attributes, values only for the color and sizing attributes
 5. Products - All products under the root category
 6. Product-to-Category mappings
 7. Attribute Values-to-Product mappings
@@ -20,14 +20,23 @@ The adapter uses DiffSync to track changes and synchronize between source and de
 
 import logging
 from time import sleep
-from typing import cast, Tuple, Dict, List, Optional
+from typing import cast, Any, Callable, Tuple, Dict, List, Optional, Set, Iterator, Union
 
 from diffsync import Adapter
 from diffsync.enum import DiffSyncModelFlags
 
-from ...helpers import base64_image_from_url, normalize_string
+from ...cache import FileCache, MemoryCache, hash_key
+from ...digest import DigestKey, compute_digests
+from ...helpers import (
+    base64_image_from_url,
+    normalize_string,
+    in_shard,
+    report_progress,
+    ProgressCallback,
+)
 from ...settings import Settings
 from ...clients.ccv.client import CCVClient
+from ...clients.ccv.models import CCVShopResult
 from ...models.ccv_shop import (
     CCVProduct,
     CCVCategory,
@@ -39,7 +48,13 @@ from ...models.ccv_shop import (
     CCVProductPhoto,
     CCVBrand,
 )
-from .constants import API_RATE_LIMIT_DELAY, DEFAULT_PHOTOS_PER_PAGE, LOAD_ALL_PAGES
+from .constants import (
+    API_RATE_LIMIT_DELAY,
+    ATTRIBUTE_VALUES_SIZE_HINT,
+    DEFAULT_PHOTOS_PER_PAGE,
+    LOAD_ALL_PAGES,
+    PRODUCT_FIELDS,
+)
 from .models import (
     BrandItem,
     PackageItem,
@@ -70,12 +85,6 @@ class CCVShopAdapter(Adapter):
 
     top_level = ["product"]
 
-    category_map: Dict[int, CCVCategory] = {}
-    product_map: Dict[int, CCVProduct] = {}
-    package_map: Dict[int, CCVPackage] = {}
-    brand_map: Dict[int, CCVBrand] = {}
-    attribute_map: Dict[int, CCVAttribute] = {}
-
     def __str__(self) -> str:
         return "CCVShopAdapter"
 
@@ -84,6 +93,10 @@ class CCVShopAdapter(Adapter):
         *args,
         settings: Settings,
         client: CCVClient,
+        shard: Optional[Tuple[int, int]] = None,
+        shard_category: Optional[str] = None,
+        cache: Optional[Union[FileCache, MemoryCache]] = None,
+        progress: Optional[ProgressCallback] = None,
         **kwargs,
     ) -> None:
         super().__init__(*args, **kwargs)
@@ -95,10 +108,97 @@ class CCVShopAdapter(Adapter):
         self.conn = client
         self.root_category: Optional[CCVCategory] = None
 
+        # Loaded objects by their CCV id, per instance as several adapters may share a process
+        self.category_map: Dict[int, CCVCategory] = {}
+        self.product_map: Dict[int, CCVProduct] = {}
+        self.package_map: Dict[int, CCVPackage] = {}
+        self.brand_map: Dict[int, CCVBrand] = {}
+        self.attribute_map: Dict[int, CCVAttribute] = {}
+
+        # Only products in this slice are loaded, see `load_products`
+        self.shard = shard
+        self.shard_category = shard_category
+
+        # Attribute lookups by normalized name and by (attribute, normalized value)
+        self.attribute_index: Dict[str, CCVAttribute] = {}
+        self.attribute_value_index: Dict[Tuple[str, str], CCVAttributeValue] = {}
+        self._loaded_attributes: Set[str] = set()
+
+        # Content digest per model, used by the diff to skip identical products
+        self.digests: Dict[DigestKey, str] = {}
+
+        # Called with (stage, current, total) while loading
+        self.progress = progress
+
+        # Reference data (brands, packages, categories, attributes) shared between runs
+        self.cache = cache if cache is not None else self.create_reference_cache(settings)
+        self._refetched_references: Set[str] = set()
+
+    @staticmethod
+    def create_reference_cache(settings: Settings) -> Optional[FileCache]:
+        """Create the reference data cache for the shop in settings, if caching is enabled."""
+        if not settings.cache.enabled or not settings.ccv_shop.url:
+            return None
+
+        return FileCache(
+            settings.cache.directory,
+            f"ccv-{hash_key(settings.ccv_shop.url)[:12]}",
+            settings.cache.reference_ttl,
+        )
+
+    def _get_reference_items(
+        self, key: str, fetch: Callable[[], CCVShopResult]
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the id and name of reference items, from the cache when possible.
+
+        Only `id` and `name` are used by this adapter, so nothing else is stored.
+        """
+        if self.cache:
+            items = self.cache.get(key)
+            if items is not None:
+                logger.debug(f"Using cached {key}")
+                return items
+
+        result = fetch()
+        items = [
+            {"id": item.get("id"), "name": item.get("name")}
+            for item in cast(dict, result.data).get("items") or []
+        ]
+
+        if self.cache:
+            self.cache.set(key, items)
+
+        return items
+
+    def _refetch_reference(self, key: str, load: Callable[[], None]) -> bool:
+        """
+        Fetch reference items again after a lookup missed, at most once per key per run.
+
+        An item added in the shop after the items were loaded, e.g. by another process or
+        after the cache was written, is missing from them until they are fetched again.
+
+        Returns:
+            bool: True when the items were fetched again, the lookup can be retried.
+        """
+        if key in self._refetched_references:
+            return False
+
+        logger.info(f"Loaded {key} are missing an item, fetching them again")
+        self._refetched_references.add(key)
+        if self.cache:
+            self.cache.invalidate(key)
+        load()
+        return True
+
     def load_brands(self) -> None:
         """Load all brands from CCVShop."""
-        brands = self.conn.brands.get_brands(total_pages=LOAD_ALL_PAGES)
-        brand_items: List[BrandItem] = cast(dict, brands.data).get("items") or []
+        brand_items = cast(
+            List[BrandItem],
+            self._get_reference_items(
+                "brands", lambda: self.conn.brands.get_brands(total_pages=LOAD_ALL_PAGES)
+            ),
+        )
 
         for b in brand_items:
             brand, _ = cast(
@@ -115,8 +215,12 @@ class CCVShopAdapter(Adapter):
 
     def load_packages(self) -> None:
         """Load all packages from CCVShop."""
-        packages = self.conn.packages.get_packages(total_pages=LOAD_ALL_PAGES)
-        package_items: List[PackageItem] = cast(dict, packages.data).get("items") or []
+        package_items = cast(
+            List[PackageItem],
+            self._get_reference_items(
+                "packages", lambda: self.conn.packages.get_packages(total_pages=LOAD_ALL_PAGES)
+            ),
+        )
 
         for p in package_items:
             package, _ = cast(
@@ -133,8 +237,12 @@ class CCVShopAdapter(Adapter):
 
     def load_categories(self) -> None:
         """Load all categories from CCVShop and identify root category."""
-        categories = self.conn.categories.get_categories(total_pages=LOAD_ALL_PAGES)
-        category_items: List[CategoryItem] = cast(dict, categories.data).get("items") or []
+        category_items = cast(
+            List[CategoryItem],
+            self._get_reference_items(
+                "categories", lambda: self.conn.categories.get_categories(total_pages=LOAD_ALL_PAGES)
+            ),
+        )
 
         for c in category_items:
             if c.get("name", "").strip().lower():
@@ -154,9 +262,18 @@ class CCVShopAdapter(Adapter):
                 category.model_flags = DiffSyncModelFlags.IGNORE
 
     def load_attributes(self) -> None:
-        """Load all attributes and their values from CCVShop."""
-        attributes = self.conn.attributes.get_attributes(total_pages=LOAD_ALL_PAGES)
-        attribute_items: List[AttributeItem] = cast(dict, attributes.data).get("items") or []
+        """
+        Load all attributes from CCVShop.
+
+        Only the values of the attributes named in settings (color and sizing category)
+        are loaded eagerly, values of any other attribute are loaded on first lookup.
+        """
+        attribute_items = cast(
+            List[AttributeItem],
+            self._get_reference_items(
+                "attributes", lambda: self.conn.attributes.get_attributes(total_pages=LOAD_ALL_PAGES)
+            ),
+        )
 
         for attr in attribute_items:
             attribute, _ = cast(
@@ -168,97 +285,247 @@ class CCVShopAdapter(Adapter):
                 ),
             )
             self.attribute_map[attribute.id] = attribute
+            self.attribute_index[attribute.name] = attribute
             attribute.model_flags = DiffSyncModelFlags.IGNORE
 
-            attribute_values = self.conn.attributes.get_attribute_values(
-                f"{attribute.id}"
-            )
-            value_items: List[AttributeValueItem] = cast(dict, attribute_values.data).get("items") or []
+        eager = {
+            normalize_string(self.settings.ccv_shop.color_category),
+            normalize_string(self.settings.ccv_shop.sizing_category),
+        }
+        for name in eager:
+            attribute = self.attribute_index.get(name)
+            if attribute:
+                self.load_attribute_values(attribute)
+
+    def load_attribute_values(self, attribute: CCVAttribute) -> None:
+        """Load the values of a single attribute into the attribute value index."""
+        value_items = cast(
+            List[AttributeValueItem],
+            self._get_reference_items(
+                f"attribute_values:{attribute.id}",
+                lambda: self.conn.attributes.get_attribute_values(f"{attribute.id}"),
+            ),
+        )
 
-            for val in value_items:
-                value, created = cast(
-                    Tuple[CCVAttributeValue, bool],
-                    self.get_or_instantiate(
-                        self.attribute_value,
-                        {
-                            "attribute": attribute.name,
-                            "value": normalize_string(val["name"]),
-                        },
-                        {
-                            "id": val["id"],
-                        },
-                    ),
-                )
+        for val in value_items:
+            self.add_attribute_value(attribute, val["name"], val["id"])
+
+        self._loaded_attributes.add(attribute.name)
+
+    def add_attribute_value(
+        self, attribute: CCVAttribute, value: str, id: int, created_in_shop: bool = False
+    ) -> CCVAttributeValue:
+        """
+        Register an attribute value in the adapter and in the attribute value index.
+
+        When the value was just created in the shop the cached values of its attribute are
+        dropped, so later runs and other adapters sharing the cache fetch them again.
+        Appending to the cached list instead would lose values other processes add.
+        """
+        attribute_value, created = cast(
+            Tuple[CCVAttributeValue, bool],
+            self.get_or_instantiate(
+                self.attribute_value,
+                {
+                    "attribute": attribute.name,
+                    "value": normalize_string(value),
+                },
+                {
+                    "id": id,
+                },
+            ),
+        )
 
-                if created:
-                    attribute.add_child(value)
+        if created:
+            attribute.add_child(attribute_value)
+
+        self.attribute_value_index[(attribute.name, attribute_value.value)] = attribute_value
+
+        if created_in_shop and self.cache:
+            self.cache.invalidate(f"attribute_values:{attribute.id}")
+
+        return attribute_value
+
+    def get_attribute(self, name: str) -> Optional[CCVAttribute]:
+        """Look up a loaded attribute by name."""
+        return self.attribute_index.get(normalize_string(name))
+
+    def get_attribute_value(self, attribute: str, value: str) -> Optional[CCVAttributeValue]:
+        """
+        Look up an attribute value by attribute name and value.
+
+        Values of attributes that were not loaded eagerly are fetched on first use. On a
+        miss the values of the attribute are fetched from the shop once more, the value may
+        have been created elsewhere since they were loaded or cached, see
+        `_refetch_reference`. Only a value that is still missing should be created.
+        """
+        attribute_name = normalize_string(attribute)
+        attribute_obj = self.attribute_index.get(attribute_name)
+        if not attribute_obj:
+            return None
+
+        key = (attribute_name, normalize_string(value))
+        if attribute_name not in self._loaded_attributes:
+            self.load_attribute_values(attribute_obj)
+        elif key not in self.attribute_value_index:
+            self._refetch_reference(
+                f"attribute_values:{attribute_obj.id}",
+                lambda: self.load_attribute_values(attribute_obj),
+            )
+
+        return self.attribute_value_index.get(key)
 
     def load_products(self) -> None:
-        """Load all products from the root category."""
+        """
+        Load all products from the root category.
+
+        When a shard category is set, products are loaded from that category instead,
+        when a shard is set only products whose productnumber hashes into it are kept.
+        Brands, packages and categories missing from the cached reference data are fetched
+        again once, see `_refetch_reference`.
+        """
+        if not self.root_category:
+            self._refetch_reference("categories", self.load_categories)
         if not self.root_category:
             raise ValueError(
                 f"Root category of name {self.settings.ccv_shop.root_category} is not defined"
             )
 
+        source_category = self.root_category
+        if self.shard_category:
+            source_category = cast(
+                Optional[CCVCategory],
+                self.get_or_none(self.category, {"name": self.shard_category}),
+            )
+            if not source_category and self._refetch_reference("categories", self.load_categories):
+                source_category = cast(
+                    Optional[CCVCategory],
+                    self.get_or_none(self.category, {"name": self.shard_category}),
+                )
+            if not source_category:
+                raise ValueError(
+                    f"Shard category of name {self.shard_category} is not defined"
+                )
+
         logger.info(
-            f"Gathering products from root category: {self.root_category.name} | {self.root_category.id}"
+            f"Gathering products from category: {source_category.name} | {source_category.id}"
         )
 
         products = self.conn.product.get_products_by_categories(
-            f"{self.root_category.id}", total_pages=LOAD_ALL_PAGES
+            f"{source_category.id}",
+            total_pages=LOAD_ALL_PAGES,
+            fields=PRODUCT_FIELDS,
         )
         product_items: List[ProductItem] = cast(dict, products.data).get("items") or []
 
         for item in product_items:
-            name = item.get("name", "")
-            product_number = item.get("productnumber", "")
+            if in_shard(item.get("productnumber", ""), self.shard):
+                self._load_product_item(item)
 
-            logger.debug(f"Processing: {product_number}: {name}")
+    def _load_product_item(self, item: ProductItem) -> Optional[CCVProduct]:
+        """Load a product listed by the shop, None when the item misses required fields."""
+        name = item.get("name", "")
+        product_number = item.get("productnumber", "")
+        logger.debug(f"Processing: {product_number}: {name}")
 
+        package = self.package_map.get(item["package"]["id"])
+        if not package and self._refetch_reference("packages", self.load_packages):
             package = self.package_map.get(item["package"]["id"])
-            if not package:
-                raise ValueError(
-                    f"Package with id {item['package']['id']} cannot be found in package map"
-                )
+        if not package:
+            raise ValueError(
+                f"Package with id {item['package']['id']} cannot be found in package map"
+            )
 
+        brand = self.brand_map.get(item["brand"]["id"])
+        if not brand and self._refetch_reference("brands", self.load_brands):
             brand = self.brand_map.get(item["brand"]["id"])
-            if not brand:
-                raise ValueError(
-                    f"Brand with id {item['brand']['id']} cannot be found in brand map"
-                )
+        if not brand:
+            raise ValueError(
+                f"Brand with id {item['brand']['id']} cannot be found in brand map"
+            )
 
-            try:
-                product, _ = cast(
-                    Tuple[CCVProduct, bool],
-                    self.get_or_instantiate(
-                        self.product,
-                        {
-                            "productnumber": product_number,
-                        },
-                        {
-                            "name": name,
-                            "id": item["id"],
-                            "package": normalize_string(package.name),
-                            "description": item["description"],
-                            "price": item["price"],
-                            "brand": normalize_string(brand.name),
-                            "page_title": item["page_title"],
-                            "meta_description": item["meta_description"],
-                            "meta_keywords": item["meta_keywords"],
-                        },
-                    ),
-                )
-                self.product_map[product.id] = product
+        try:
+            product, _ = cast(
+                Tuple[CCVProduct, bool],
+                self.get_or_instantiate(
+                    self.product,
+                    {
+                        "productnumber": product_number,
+                    },
+                    {
+                        "name": name,
+                        "id": item["id"],
+                        "package": normalize_string(package.name),
+                        "description": item["description"],
+                        "price": item["price"],
+                        "brand": normalize_string(brand.name),
+                        "page_title": item["page_title"],
+                        "meta_description": item["meta_description"],
+                        "meta_keywords": item["meta_keywords"],
+                    },
+                ),
+            )
+            self.product_map[product.id] = product
 
-            except KeyError as err:
-                logger.error(
-                    f"KeyError while processing product {product_number}: {err}. "
-                    f"Likely missing required fields in API response."
-                )
+            # A product missing from a category shard may just be mapped to another
+            # category on the source side, it should never be deleted from here
+            if self.shard_category:
+                product.model_flags |= DiffSyncModelFlags.SKIP_UNMATCHED_DST
+
+            return product
+
+        except KeyError as err:
+            logger.error(
+                f"KeyError while processing product {product_number}: {err}. "
+                f"Likely missing required fields in API response."
+            )
+            return None
+
+    def load_unlinked_products(self, product_numbers: Set[str]) -> int:
+        """
+        Load products of the root category that a category shard did not load.
+
+        A category shard only loads the products linked to the shard category. A source
+        product newly mapped to that category already exists in the shop without the link,
+        it would otherwise be created a second time. The products are loaded with their
+        categories, attributes and photos, so the diff only adds what is missing.
+
+        Args:
+            product_numbers: Productnumbers of source products missing from this adapter.
 
-    def load_products_to_category(self) -> None:
-        """Load all product-to-category mappings."""
-        for cat_id, cat in self.category_map.items():
+        Returns:
+            int: Number of products loaded.
+        """
+        assert self.root_category, "References must be loaded before products"
+
+        result = self.conn.product.get_products_by_categories(
+            f"{self.root_category.id}",
+            total_pages=LOAD_ALL_PAGES,
+            fields=PRODUCT_FIELDS,
+        )
+        products = [
+            product
+            for item in cast(List[ProductItem], cast(dict, result.data).get("items") or [])
+            if item.get("productnumber") in product_numbers
+            and self.get_or_none(self.product, item.get("productnumber", "")) is None
+            and (product := self._load_product_item(item))
+        ]
+        if not products:
+            return 0
+
+        self.load_products_to_category(products)
+        self.load_attribute_values_to_product(products)
+        self.load_product_photos(products)
+        self.digests = compute_digests(self)
+        return len(products)
+
+    def load_products_to_category(self, products: Optional[List[CCVProduct]] = None) -> None:
+        """Load all product-to-category mappings, or only those of `products`."""
+        product_ids = {product.id for product in products} if products is not None else None
+        for index, (cat_id, cat) in enumerate(self.category_map.items(), start=1):
+            report_progress(
+                self.progress, "Loading product categories", index, len(self.category_map)
+            )
             prod_to_cat = self.conn.product_to_category.get_product_to_category(
                 id=cat_id, total_pages=LOAD_ALL_PAGES
             )
@@ -266,7 +533,7 @@ class CCVShopAdapter(Adapter):
 
             for item in prod_to_cat_items:
                 product = self.product_map.get(item.get("product_id"))
-                if product:
+                if product and (product_ids is None or product.id in product_ids):
                     cat_to_dev, _ = self.get_or_instantiate(
                         CCVCategoryToDevice,
                         {
@@ -282,9 +549,15 @@ class CCVShopAdapter(Adapter):
 
                     product.add_child(cat_to_dev)
 
-    def load_attribute_values_to_product(self) -> None:
-        """Load all attribute values attached to products."""
-        products = cast(List[CCVProduct], self.get_all(self.product))
+    def _throttle(self) -> None:
+        """Wait between per-product requests, unless the client spaces its requests already."""
+        if not self.conn.rate_limiter:
+            sleep(API_RATE_LIMIT_DELAY)
+
+    def load_attribute_values_to_product(self, products: Optional[List[CCVProduct]] = None) -> None:
+        """Load all attribute values attached to products, or only those of `products`."""
+        if products is None:
+            products = cast(List[CCVProduct], self.get_all(self.product))
 
         if not products:
             logger.warning(
@@ -293,13 +566,18 @@ class CCVShopAdapter(Adapter):
             )
             return
 
-        for product in products:
-            sleep(API_RATE_LIMIT_DELAY)
+        for index, product in enumerate(products, start=1):
+            report_progress(self.progress, "Loading product attributes", index, len(products))
+            self._throttle()
 
-            result = self.conn.product_to_attribute.get_product_to_attribute_values(
-                f"{product.id}"
+            attribute_items = cast(
+                Iterator[AttributeValueToProductItem],
+                self.conn.product_to_attribute.iter_product_to_attribute_values(
+                    f"{product.id}",
+                    size_hint=ATTRIBUTE_VALUES_SIZE_HINT,
+                    total_pages=LOAD_ALL_PAGES,
+                ),
             )
-            attribute_items: List[AttributeValueToProductItem] = cast(dict, result.data).get("items") or []
 
             for item in attribute_items:
                 attribute_value_to_product, _ = self.get_or_instantiate(
@@ -314,9 +592,10 @@ class CCVShopAdapter(Adapter):
 
                 product.add_child(attribute_value_to_product)
 
-    def load_product_photos(self) -> None:
-        """Load all product photos."""
-        products = cast(List[CCVProduct], self.get_all(self.product))
+    def load_product_photos(self, products: Optional[List[CCVProduct]] = None) -> None:
+        """Load all product photos, or only those of `products`."""
+        if products is None:
+            products = cast(List[CCVProduct], self.get_all(self.product))
 
         if not products:
             logger.warning(
@@ -325,8 +604,9 @@ class CCVShopAdapter(Adapter):
             )
             return
 
-        for product in products:
-            sleep(API_RATE_LIMIT_DELAY)
+        for index, product in enumerate(products, start=1):
+            report_progress(self.progress, "Loading product photos", index, len(products))
+            self._throttle()
 
             result = self.conn.photos.get_photos(
                 per_page=DEFAULT_PHOTOS_PER_PAGE,
@@ -351,13 +631,45 @@ class CCVShopAdapter(Adapter):
 
                 product.add_child(product_photo)
 
-    def load(self) -> None:
-        """Load all models by calling other methods in the correct order."""
+    def load_references(self) -> None:
+        """Load the reference data products point to, cached between runs."""
+        report_progress(self.progress, "Loading reference data")
         self.load_packages()
         self.load_brands()
         self.load_categories()
         self.load_attributes()
+
+    def load_existing(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Register the shop objects referenced by a saved diff without querying the shop.
+
+        The objects only hold their identifiers, id and the attributes recorded in the
+        diff, which is all the create, update and delete calls of the models need.
+
+        Args:
+            records: Change records of existing objects, parents before children,
+                as returned by `syncly.diff_file.read_diff`.
+        """
+        for record in records:
+            model = getattr(self, record["type"])
+            obj = model.model_construct(**record["keys"], **record["-"], id=record["id"])
+            self.add(obj)
+
+            parent = record.get("parent")
+            if parent:
+                parent_obj = self.get_or_none(parent["type"], parent["name"])
+                if parent_obj:
+                    parent_obj.add_child(obj)
+
+            if isinstance(obj, CCVProduct):
+                self.product_map[obj.id] = obj
+
+    def load(self) -> None:
+        """Load all models by calling other methods in the correct order."""
+        self.load_references()
+        report_progress(self.progress, "Loading products")
         self.load_products()
         self.load_products_to_category()
         self.load_attribute_values_to_product()
         self.load_product_photos()
+        self.digests = compute_digests(self)
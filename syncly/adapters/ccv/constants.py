@@ -5,4 +5,19 @@ API_RATE_LIMIT_DELAY = 0.2  # Seconds to wait between API calls to avoid hitting
 
 # Pagination
 DEFAULT_PHOTOS_PER_PAGE = 100
+ATTRIBUTE_VALUES_SIZE_HINT = 250  # Page size for product attribute values, sizes x colors
 LOAD_ALL_PAGES = -1  # Special value to load all pages
+
+# Product listing projection, only the fields CCVProduct compares against
+PRODUCT_FIELDS = (
+    "id",
+    "name",
+    "productnumber",
+    "package",
+    "brand",
+    "price",
+    "description",
+    "page_title",
+    "meta_description",
+    "meta_keywords",
+)
@@ -6,15 +6,13 @@ them into ThirdPartyProduct instances for synchronization with the CCV shop.
 
 Data Flow:
 1. Read CSV file from connection
-2. Parse rows into ProductRow TypedDict
-3. Filter and validate products
-4. Transform to ThirdPartyProduct format
-5. Add variants (sizes) based on size ranges
+2. Filter rows on the raw columns, the rest become ProductRow TypedDict
+3. Transform to ThirdPartyProduct format
+4. Add variants (sizes) based on size ranges
 """
 
-import json
 import logging
-from typing import Any, Generator, List, Tuple, cast
+from typing import Any, Generator, List, Optional, Tuple, cast
 
 from pydantic import ValidationError
 
@@ -29,6 +27,7 @@ from syncly.helpers import (
 
 from ...clients.local import LocalFileClient
 from ...models.third_party import ThirdPartyProduct
+from ...row_filter import RowFilter
 from ..third_party import ThirdPartyAdapter
 from .constants import DEFAULT_PACKAGE
 from .helpers import (
@@ -59,6 +58,9 @@ class EltenAdapter(ThirdPartyAdapter):
     and transforms them into standardized ThirdPartyProduct objects.
     """
 
+    # The attributes read the base prices
+    parse_state_attributes = ("price_mapping",)
+
     def __init__(self, *args: Any, **kwargs: Any):
         super().__init__(*args, **kwargs)
 
@@ -70,6 +72,20 @@ class EltenAdapter(ThirdPartyAdapter):
     def __str__(self) -> str:
         return "EltenAdapter"
 
+    def create_row_filter(self) -> RowFilter:
+        """
+        Create the rules a row should pass, checked on the raw columns.
+
+        Blank values count as missing, like `parse_product_row` turns them into None.
+        """
+        return (
+            RowFilter(list(ProductRow.__annotations__))
+            .require("manufacturer_article_nr", strip=True)
+            .require("manufacturer_article_name", strip=True)
+            # Skip products without pricing
+            .require("list_price", strip=True)
+        )
+
     def get_product_data(self) -> Generator[ProductRow, Any, Any]:
         """Parse CSV file, calculate base prices, and yield ProductRow dictionaries."""
         assert self.conn, "Connection must be established before reading products"
@@ -80,28 +96,11 @@ class EltenAdapter(ThirdPartyAdapter):
                 file.read(), include_header=False, seperator=";", encoding="utf-8"
             )
             self.price_mapping = calculate_base_prices(product_data)
-            for product in product_data:
-                yield parse_product_row(product)
-
-    def should_process_product(self, row: ProductRow) -> bool:
-        """Check if product should be processed based on business rules."""
-        print(json.dumps(row, indent=4))
-        if not row.get("manufacturer_article_nr"):
-            logger.debug("Skipping product without article number")
-            return False
 
-        if not row.get("manufacturer_article_name"):
-            logger.debug("Skipping product without article name")
-            return False
-
-        # Skip products without pricing
-        if not row.get("list_price"):
-            logger.debug(
-                f"Skipping product {row.get('manufacturer_article_nr')} without price"
-            )
-            return False
-
-        return True
+            row_filter = self.create_row_filter()
+            for product in row_filter.filter(product_data):
+                yield parse_product_row(product)
+            row_filter.log_summary(str(self))
 
     def build_product_ids(self, row: ProductRow) -> dict[str, str]:
         """Extract product identification fields."""
@@ -134,15 +133,21 @@ class EltenAdapter(ThirdPartyAdapter):
             "meta_description": build_meta_description(row),
         }
 
-    def create_product(self, row: ProductRow, brand: str) -> ThirdPartyProduct:
-        """Create or retrieve a product from a data row."""
+    def row_brand(self, row: ProductRow) -> str:
+        """Extract the brand from the manufacturer_article_group field."""
+        return get_brand_from_article_group(row)
+
+    def create_product(
+        self, row: ProductRow, brand: str, attrs: Optional[dict[str, Any]] = None
+    ) -> ThirdPartyProduct:
+        """Create or retrieve a product from a data row, `attrs` are built when not given."""
         try:
             product, _ = cast(
                 Tuple[ThirdPartyProduct, bool],
                 self.get_or_instantiate(
                     model=self.product,
                     ids=self.build_product_ids(row),
-                    attrs=self.build_product_attrs(row, brand),
+                    attrs=attrs if attrs is not None else self.build_product_attrs(row, brand),
                 ),
             )
             return product
@@ -262,15 +267,12 @@ class EltenAdapter(ThirdPartyAdapter):
         """
         Load and process all products from the data source.
 
-        Orchestrates: reading, filtering, creating/updating products, adding variants, and images.
+        Orchestrates: reading, creating/updating products, adding variants, and images.
+        Rows are filtered while reading, see `create_row_filter`, and the product attributes
+        are built by `parse_workers` processes, see `iter_product_attrs`.
         """
-        for row in self.get_product_data():
-            if not self.should_process_product(row):
-                continue
-
-            # Extract brand from the manufacturer_article_group field
-            brand = get_brand_from_article_group(row)
-            product = self.create_product(row, brand)
+        for row, ids, attrs in self.iter_product_attrs(self.get_product_data()):
+            product = self.get_or_create_product(row, ids, attrs)
             self.add_variants(row, product)
             self.add_image_from_media(row, product)
 
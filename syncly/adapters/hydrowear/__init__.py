@@ -6,15 +6,14 @@ them into ThirdPartyProduct instances for synchronization with the CCV shop.
 
 Data Flow:
 1. Read CSV file from connection
-2. Parse rows into ProductRow TypedDict
-3. Filter and validate products
-4. Transform to ThirdPartyProduct format
-5. Add variants (colors, sizes, images)
+2. Filter rows on the raw columns, the rest become ProductRow TypedDict
+3. Transform to ThirdPartyProduct format
+4. Add variants (colors, sizes, images)
 """
 
 import logging
 from pydantic import ValidationError
-from typing import List, Any, Generator, Tuple, cast
+from typing import List, Any, Generator, Optional, Tuple, cast
 
 from syncly.helpers import (
     xlsx_bytes_to_list,
@@ -23,8 +22,9 @@ from syncly.helpers import (
     append_if_not_exists,
     pretty_validation_error,
 )
+from ...row_filter import RowFilter
 from ..third_party import ThirdPartyAdapter
-from .models import ProductRow
+from .models import FIELDS, ProductRow
 from .helpers import (
     parse_product_row,
     calculate_base_prices,
@@ -52,6 +52,9 @@ class HydroWearAdapter(ThirdPartyAdapter):
     and transforms them into standardized ThirdPartyProduct objects.
     """
 
+    # The attributes read the base prices
+    parse_state_attributes = ("price_mapping",)
+
     def __init__(self, *args: Any, **kwargs: Any):
         super().__init__(*args, **kwargs)
 
@@ -62,6 +65,10 @@ class HydroWearAdapter(ThirdPartyAdapter):
     def __str__(self) -> str:
         return "HydroWearAdapter"
 
+    def create_row_filter(self) -> RowFilter:
+        """Create the rules a row should pass, checked on the raw columns."""
+        return RowFilter(FIELDS).require("article_number")
+
     def get_product_data(self) -> Generator[ProductRow, Any, Any]:
         """Parse CSV file, calculate base prices, and yield ProductRow dictionaries."""
         assert self.conn, "Connection must be established before reading products"
@@ -69,16 +76,11 @@ class HydroWearAdapter(ThirdPartyAdapter):
         with self.conn as file:
             product_data = xlsx_bytes_to_list(file.read(), include_header=False)
             self.price_mapping = calculate_base_prices(product_data)
-            for product in product_data:
-                yield parse_product_row(product)
-
-    def should_process_product(self, row: ProductRow) -> bool:
-        """Check if product should be processed based on business rules."""
-        if not row.get("article_number"):
-            logger.debug("Skipping product without article number")
-            return False
 
-        return True
+            row_filter = self.create_row_filter()
+            for product in row_filter.filter(product_data):
+                yield parse_product_row(product)
+            row_filter.log_summary(str(self))
 
     def build_product_ids(self, row: ProductRow) -> dict[str, str]:
         """Extract product identification fields."""
@@ -97,15 +99,17 @@ class HydroWearAdapter(ThirdPartyAdapter):
             "meta_description": build_meta_description(row),
         }
 
-    def create_product(self, row: ProductRow, brand: str) -> ThirdPartyProduct:
-        """Create or retrieve a product from a data row."""
+    def create_product(
+        self, row: ProductRow, brand: str, attrs: Optional[dict[str, Any]] = None
+    ) -> ThirdPartyProduct:
+        """Create or retrieve a product from a data row, `attrs` are built when not given."""
         try:
             product, _ = cast(
                 Tuple[ThirdPartyProduct, bool],
                 self.get_or_instantiate(
                     model=self.product,
                     ids=self.build_product_ids(row),
-                    attrs=self.build_product_attrs(row, brand),
+                    attrs=attrs if attrs is not None else self.build_product_attrs(row, brand),
                 ),
             )
             return product
@@ -138,15 +142,12 @@ class HydroWearAdapter(ThirdPartyAdapter):
         """
         Load and process all products from the data source.
 
-        Orchestrates: reading, filtering, creating/updating products, and adding variants.
+        Orchestrates: reading, creating/updating products, and adding variants. Rows are
+        filtered while reading, see `create_row_filter`, and the product attributes are
+        built by `parse_workers` processes, see `iter_product_attrs`.
         """
-        brand = normalize_string(self.settings.ccv_shop.brand)
-
-        for row in self.get_product_data():
-            if not self.should_process_product(row):
-                continue
-
-            product = self.create_product(row, brand)
+        for row, ids, attrs in self.iter_product_attrs(self.get_product_data()):
+            product = self.get_or_create_product(row, ids, attrs)
             self.add_variants(row, product)
 
         return cast(List[ThirdPartyProduct], self.get_all(self.product))
@@ -5,31 +5,36 @@ This adapter processes product data from Mascot XLSX files and converts
 them into ThirdPartyProduct instances for synchronization with the CCV shop.
 
 Data Flow:
-1. Read XLSX files (product data + availability) from FTP connection
-2. Parse rows into ProductRow TypedDict
-3. Merge availability data with product data
-4. Filter products (stock status, exclusions)
+1. Download the product data XLSX and availability CSV from FTP connection to disk
+2. Stream the used columns of the product data
+3. Filter rows (exclusions, optionally stock status) on the raw columns, the rest
+   become ProductRow TypedDict
+4. Merge availability data, indexed by EAN number, with product data
 5. Transform to ThirdPartyProduct format
 6. Add variants (colors, sizes, images)
 """
 
 import logging
+import os
+import tempfile
 from pydantic import ValidationError
-from typing import List, Any, Generator, Tuple, cast
+from typing import List, Any, Generator, Iterator, Optional, Tuple, cast
 
 from syncly.helpers import (
     wrap_style,
-    xlsx_bytes_to_list,
+    iter_xlsx_rows,
     normalize_string,
     append_if_not_exists,
     pretty_validation_error,
 )
+from ...row_filter import RowFilter
 from ..third_party import ThirdPartyAdapter
-from .models import ProductRow
+from .models import FIELDS, ProductRow
 from .helpers import (
     parse_product_row,
-    create_availability_mapping,
-    is_excluded,
+    AvailabilityIndex,
+    create_availability_index,
+    has_stock,
     build_name,
     build_description,
     build_meta_description,
@@ -38,7 +43,7 @@ from .helpers import (
     get_price,
     calculate_variant_price,
 )
-from .constants import DEFAULT_PACKAGE
+from .constants import DEFAULT_PACKAGE, PRODUCT_COLUMNS
 from ...models.third_party import ThirdPartyProduct
 
 
@@ -53,6 +58,9 @@ class MascotAdapter(ThirdPartyAdapter):
     and transforms them into standardized ThirdPartyProduct objects.
     """
 
+    # The attributes read the base prices
+    parse_state_attributes = ("price_mapping",)
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
 
@@ -62,9 +70,16 @@ class MascotAdapter(ThirdPartyAdapter):
     def __str__(self) -> str:
         return "MascotAdapter"
 
-    def should_process_product(self, row: ProductRow) -> bool:
-        """Check if product should be processed based on exclusion rules."""
-        return not is_excluded(row, self.settings)
+    def create_row_filter(self, availability: AvailabilityIndex) -> RowFilter:
+        """Create the exclusion rules, checked on the raw product data columns."""
+        row_filter = RowFilter(PRODUCT_COLUMNS)
+        row_filter.exclude("product_type", self.settings.mascot.excluded_product_types)
+        row_filter.exclude("article_number", self.settings.mascot.excluded_products, normalize=str.strip)
+        if self.settings.mascot.only_stocked:
+            row_filter.add(
+                "ean_number", lambda ean: has_stock(*availability.get(ean)), "out of stock"
+            )
+        return row_filter
 
     def build_product_ids(self, row: ProductRow) -> dict[str, str]:
         """Extract product identification fields."""
@@ -84,15 +99,17 @@ class MascotAdapter(ThirdPartyAdapter):
             "meta_description": build_meta_description(row),
         }
 
-    def create_product(self, row: ProductRow, brand: str) -> ThirdPartyProduct:
-        """Create or retrieve a product from a data row."""
+    def create_product(
+        self, row: ProductRow, brand: str, attrs: Optional[dict[str, Any]] = None
+    ) -> ThirdPartyProduct:
+        """Create or retrieve a product from a data row, `attrs` are built when not given."""
         try:
             product, _ = cast(
                 Tuple[ThirdPartyProduct, bool],
                 self.get_or_instantiate(
                     model=self.product,
                     ids=self.build_product_ids(row),
-                    attrs=self.build_product_attrs(row, brand),
+                    attrs=attrs if attrs is not None else self.build_product_attrs(row, brand),
                 ),
             )
             return product
@@ -127,11 +144,32 @@ class MascotAdapter(ThirdPartyAdapter):
         if color and image_url:
             append_if_not_exists((color, image_url), product.images)
 
+    def _read_product_rows(
+        self, path: str, row_filter: Optional[RowFilter] = None
+    ) -> Iterator[ProductRow]:
+        """
+        Stream the used columns of the product data file, one ProductRow at a time.
+
+        Rows excluded by `row_filter` are skipped before they become a ProductRow.
+        """
+        columns = [FIELDS.index(field) for field in PRODUCT_COLUMNS]
+        rows = iter_xlsx_rows(path, columns=columns, include_header=False)
+        if row_filter:
+            rows = row_filter.filter(rows)
+
+        for values in rows:
+            yield parse_product_row(values, PRODUCT_COLUMNS)
+
     def _get_products(self) -> Generator[ProductRow, Any, Any]:  # type: ignore
-        """Parse XLSX files and yield ProductRow dictionaries with availability data."""
+        """
+        Parse XLSX files and yield ProductRow dictionaries with availability data.
+
+        The product data is downloaded to a temporary file and read twice, once for the
+        base prices and once for the products, so the rows are never all in memory.
+        """
         assert self.conn, "Connection must be established before reading products"
 
-        with self.conn as client:
+        with self.conn as client, tempfile.TemporaryDirectory(prefix="syncly-mascot-") as tmp:
             files = set(client.list_files())
             required = {
                 self.settings.mascot.product_data,
@@ -143,45 +181,41 @@ class MascotAdapter(ThirdPartyAdapter):
                     f"Missing files: {sorted(missing)} (found: {sorted(files)})"
                 )
 
-            product_data: List[List[Any]] = xlsx_bytes_to_list(
-                client.download_file(self.settings.mascot.product_data),
-                include_header=False,
-            )
+            product_file = str(client.download_to_file(
+                self.settings.mascot.product_data,
+                os.path.join(tmp, os.path.basename(self.settings.mascot.product_data)),
+            ))
 
-            # Calculate base prices before processing products
-            self.price_mapping = calculate_base_prices(product_data)
+            # Calculate base prices before processing products, from every row as before
+            self.price_mapping = calculate_base_prices(self._read_product_rows(product_file))
 
-            availability_csv = client.download_file(
+            availability = create_availability_index(str(client.download_to_file(
                 self.settings.mascot.availability,
-            )
-            availability_data = create_availability_mapping(availability_csv)
-
-            for product in product_data:
-                product_row = parse_product_row(product)
+                os.path.join(tmp, os.path.basename(self.settings.mascot.availability)),
+            )))
 
+            row_filter = self.create_row_filter(availability)
+            for product_row in self._read_product_rows(product_file, row_filter):
                 ean = product_row.get("ean_number")
                 if not ean:
                     raise ValueError("Missing ean number")
 
-                avail = availability_data.get(ean, {})
-                product_row["stock_status"] = avail.get("stock_status")
-                product_row["reorder_status"] = avail.get("reorder_status")
+                product_row["stock_status"], product_row["reorder_status"] = availability.get(ean)
 
                 yield product_row
 
+            row_filter.log_summary(str(self))
+
     def load_products(self) -> List[ThirdPartyProduct]:
         """
         Load and process all products from the data source.
 
-        Orchestrates: reading, filtering, creating/updating products, and adding variants.
+        Orchestrates: reading, creating/updating products, and adding variants. Rows are
+        filtered while reading, see `create_row_filter`, and the product attributes are
+        built by `parse_workers` processes, see `iter_product_attrs`.
         """
-        brand = normalize_string(self.settings.ccv_shop.brand)
-
-        for row in self._get_products():
-            if not self.should_process_product(row):
-                continue
-
-            product = self.create_product(row, brand)
+        for row, ids, attrs in self.iter_product_attrs(self._get_products()):
+            product = self.get_or_create_product(row, ids, attrs)
             self.add_variants(row, product)
 
         return cast(List[ThirdPartyProduct], self.get_all(self.product))
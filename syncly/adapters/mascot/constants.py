@@ -3,5 +3,24 @@
 # Product defaults
 DEFAULT_PACKAGE = "kartonnen doos"
 
+# EAN-13 numbers, leading zeros are lost when a file stores them as numbers
+EAN_LENGTH = 13
+
 # SEO limits
 META_DESCRIPTION_MAX_LENGTH = 317
+
+# Product data columns read by this adapter, the other columns are never loaded
+PRODUCT_COLUMNS = [
+    "ean_number",
+    "article_quality_number",
+    "article_number",
+    "color",
+    "product_name_old",
+    "product_type",
+    "eu_size_part1",
+    "eu_size_part2",
+    "price",
+    "technical_text",
+    "usp_text",
+    "product_image_1000px",
+]
@@ -3,24 +3,22 @@ Helper functions for Mascot adapter data transformation.
 """
 
 import logging
-from typing import List, Any, Dict
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
 
-from .models import ProductRow, StockFlag
-from .constants import META_DESCRIPTION_MAX_LENGTH
-from ...settings import Settings
+from .models import FIELDS, ProductRow, StockFlag
+from .constants import EAN_LENGTH, META_DESCRIPTION_MAX_LENGTH
 from ...helpers import (
-    csv_bytes_to_list,
-    normalize_string,
+    iter_csv_rows,
     to_float,
 )
 
 logger = logging.getLogger(__name__)
 
 
-def parse_product_row(product: List[Any]) -> ProductRow:
-    """Convert a list of product values into a ProductRow dictionary."""
+def parse_product_row(product: Sequence[Any], fields: Sequence[str] = FIELDS) -> ProductRow:
+    """Convert a list of product values, in the order of `fields`, into a ProductRow dictionary."""
     product_row: ProductRow = {}
-    for i, field in enumerate(ProductRow.__annotations__):
+    for i, field in enumerate(fields):
         if i < len(product):
             product_row[field] = product[i]
         else:
@@ -81,52 +79,88 @@ def get_price(row: ProductRow) -> float:
         return 0.0
 
 
-def is_stocked(row: ProductRow) -> bool:
-    """Check if product is in stock based on stock status and reorder status."""
-    flag = f"{row.get('stock_status', '')}".strip().lower()
+def has_stock(stock_status: Any, reorder_status: Any) -> bool:
+    """Check if a stock status and reorder status mean the product is in stock."""
+    flag = f"{stock_status or ''}".strip().lower()
     if flag in {StockFlag.GREEN.value, StockFlag.YELLOW.value}:
         try:
-            return int(row.get("reorder_status") or 0) == 1
+            return int(reorder_status or 0) == 1
         except (TypeError, ValueError):
             return False
     return False
 
 
-def create_availability_mapping(csv_bytes: bytes) -> Dict[str, Dict[str, Any]]:
-    """Parse availability CSV and create mapping from EAN number to stock data."""
-    availability_data = {
-        x[0]: {
-            "stock_status": x[1],
-            "reorder_status": x[3],
-        }
-        for x in csv_bytes_to_list(
-            csv_bytes,
-            include_header=False,
-            seperator=";",
-        )
-    }
-
-    return availability_data
-
-
-def is_excluded(row: ProductRow, settings: Settings) -> bool:
-    """Check if product type is in the excluded list from settings."""
-    excluded = [
-        normalize_string(product_type)
-        for product_type in settings.mascot.excluded_product_types
-    ]
-    if normalize_string(str(row.get("product_type"))) in excluded:
-        return True
+def normalize_ean(ean: Any) -> str:
+    """Return an EAN as text, numeric EANs padded back to their 13 digits."""
+    text = str(ean).strip()
+    return text.zfill(EAN_LENGTH) if text.isdigit() else text
 
-    return False
+
+class AvailabilityIndex:
+    """
+    Stock and reorder status of every EAN in the availability file.
+
+    EANs are stored and looked up through `normalize_ean`, so an EAN read as text from the
+    CSV matches the same EAN read as a number from the product data.
+
+    There are only a few distinct (stock status, reorder status) pairs, so every EAN points
+    to its pair in a small table instead of holding a dict of its own.
+    """
+
+    def __init__(self) -> None:
+        self._positions: Dict[str, int] = {}
+        self._statuses: List[Tuple[Any, Any]] = []
+        self._status_positions: Dict[Tuple[Any, Any], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def add(self, ean: str, stock_status: Any, reorder_status: Any) -> None:
+        """Store the status of an EAN, a later line for the same EAN wins."""
+        status = (stock_status, reorder_status)
+        position = self._status_positions.get(status)
+        if position is None:
+            position = self._status_positions[status] = len(self._statuses)
+            self._statuses.append(status)
+
+        self._positions[normalize_ean(ean)] = position
+
+    def get(self, ean: Any) -> Tuple[Any, Any]:
+        """Return the (stock status, reorder status) of an EAN, (None, None) when unknown."""
+        position = self._positions.get(normalize_ean(ean))
+        if position is None:
+            return (None, None)
+
+        return self._statuses[position]
+
+
+def _parse_reorder_status(value: str) -> Any:
+    """Numbers are read as int, like the numeric columns pandas used to infer."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def create_availability_index(path: str) -> AvailabilityIndex:
+    """Stream the availability CSV into an index from EAN number to stock data."""
+    index = AvailabilityIndex()
+    for line in iter_csv_rows(path, include_header=False, seperator=";"):
+        if len(line) < 4:
+            logger.warning(f"Skipping incomplete availability line: {line}")
+            continue
+
+        index.add(line[0], line[1], _parse_reorder_status(line[3]))
+
+    logger.info(f"Indexed availability of {len(index)} EAN numbers")
+    return index
 
 
-def calculate_base_prices(product_data: List[List[Any]]) -> Dict[str, float]:
+def calculate_base_prices(rows: Iterable[ProductRow]) -> Dict[str, float]:
     """Calculate base prices for all products, returning mapping of article_number -> minimum price."""
     price_mapping: Dict[str, float] = {}
 
-    for product in product_data:
-        row = parse_product_row(product)
+    for row in rows:
         article_number = row.get("article_number")
         price = row.get("price")
 
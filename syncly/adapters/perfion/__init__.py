@@ -7,13 +7,18 @@ them into ThirdPartyProduct instances for synchronization with the CCV shop.
 Data Flow:
 1. Connect to Perfion API via connection client
 2. Fetch product data from API
-3. Filter products by included categories and excluded products
+3. Filter products by included categories and excluded products, in the Perfion query
 4. Transform to ThirdPartyProduct format
 5. Add variants (colors, sizes, images)
+
+A changed-only run fetches the products modified since the last successful run instead
+of the whole catalogue, see `PerfionAdapter.changed_since`.
 """
 
 import logging
-from typing import Any, Generator, List, Tuple, cast
+from datetime import datetime, timedelta, timezone
+from typing import Any, Generator, List, Optional, Tuple, cast
+from zoneinfo import ZoneInfo
 
 from pydantic import ValidationError
 from requests.exceptions import RequestException
@@ -25,9 +30,11 @@ from syncly.helpers import (
     wrap_style,
 )
 
+from ...cache import FileCache
 from ...models.third_party import ThirdPartyProduct
+from ...settings import Settings
 from ..third_party import ThirdPartyAdapter
-from .constants import DEFAULT_PACKAGE
+from .constants import DEFAULT_PACKAGE, ITEM_NUMBERS_PER_QUERY, MODIFIED_SINCE_OVERLAP
 from .helpers import (
     build_description,
     build_meta_description,
@@ -49,53 +56,62 @@ class PerfionAdapter(ThirdPartyAdapter):
     and transforms them into standardized ThirdPartyProduct objects.
     """
 
-    def __init__(self, *args: Any, **kwargs: Any) -> None:
+    def __init__(self, *args: Any, changed_only: bool = False, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         self.price_mapping: dict[str, float] = {}
 
+        # Only load products modified since the last successful run, when there is one
+        self.changed_only = changed_only
+        self.state = self.create_state_cache(self.settings)
+        self.run_started: Optional[datetime] = None
+
     def __str__(self) -> str:
         return "PerfionAdapter"
 
-    def _should_include_category(self, category: str) -> bool:
-        """Check if product category is in included categories list."""
-        included_categories = self.settings.perfion.included_categories
-
-        # If no filter specified, include all
-        if not included_categories:
-            return True
+    @staticmethod
+    def create_state_cache(settings: Settings) -> Optional[FileCache]:
+        """Create the cache holding the time of the last successful run, if caching is enabled."""
+        if not settings.cache.enabled:
+            return None
 
-        return category in included_categories
+        return FileCache(
+            settings.cache.directory, "perfion", settings.perfion.changed_only_max_age
+        )
 
-    def _is_product_excluded(self, item_number: str) -> bool:
-        """Check if product is in excluded products list."""
-        excluded_products = self.settings.perfion.excluded_products
-        return item_number in excluded_products
+    @property
+    def _last_run_key(self) -> str:
+        return f"last_run:{self.settings.perfion.url}"
 
-    def should_process_product(self, row: ProductRow) -> bool:
-        """Check if product should be processed based on business rules."""
-        category = row.get("Category")
-        item_number = row.get("ItemNumber")
+    def changed_since(self) -> Optional[datetime]:
+        """
+        Start time of the last successful run, moved back to cover clock skew.
 
-        if not item_number:
-            logger.debug("Skipping product without item number")
-            return False
+        Returns:
+            Optional[datetime]: The time in the Perfion server timezone, as its modified
+                dates are stored. None when there is no successful run within
+                `changed_only_max_age`, the whole catalogue is loaded then.
+        """
+        last_run = self.state.get(self._last_run_key) if self.state else None
+        if not last_run:
+            return None
 
-        if not category:
-            logger.debug(f"Skipping product {item_number} without category")
-            return False
+        # Times stored without a timezone are local times of an earlier version
+        since = datetime.fromisoformat(last_run).astimezone(timezone.utc)
+        since -= timedelta(seconds=MODIFIED_SINCE_OVERLAP)
+        server_timezone = ZoneInfo(self.settings.perfion.server_timezone)
+        return since.astimezone(server_timezone).replace(tzinfo=None)
 
-        if not self._should_include_category(category):
-            logger.info(
-                f"Skipping product {item_number} - category '{category}' not in "
-                f"included categories: {self.settings.perfion.included_categories}"
-            )
-            return False
+    def synced(self) -> None:
+        """
+        Store the start of this run (UTC), a later changed-only run continues from it.
 
-        if self._is_product_excluded(item_number):
-            logger.info(f"Skipping excluded product: {item_number}")
-            return False
+        Only called after a sync that applied every change.
+        """
+        # A shard only synced part of the catalogue, so later changes of the rest would be lost
+        if not self.state or not self.run_started or self.shard or self.shard_category:
+            return
 
-        return True
+        self.state.set(self._last_run_key, self.run_started.isoformat())
 
     def _calculate_base_prices(self, product_data: List[ProductRow]) -> None:
         """
@@ -125,20 +141,29 @@ class PerfionAdapter(ThirdPartyAdapter):
         """
         Fetch products from Perfion API and yield ProductRow dictionaries.
 
-        First fetches all products to calculate base prices (minimum price per ItemNumber),
-        then yields each row for processing.
+        Products are parsed while the pages are downloaded. The base prices (minimum price
+        per ItemNumber) need every row, so the parsed rows are kept for a second pass
+        that yields each row for processing.
         """
         assert self.conn, "Connection must be established before reading products"
 
+        self.run_started = datetime.now(timezone.utc)
+        since = self.changed_since() if self.changed_only else None
+        if self.changed_only and not since:
+            logger.info("No recent successful Perfion run, loading the whole catalogue")
+
         try:
-            result = self.conn.get_products(total_pages=-1)
+            # Keep the rows to allow two passes, the responses themselves are not kept
+            if since:
+                product_data = self._get_changed_products(since)
+            else:
+                product_data = cast(
+                    List[ProductRow], list(self.conn.iter_products(total_pages=-1))
+                )
         except RequestException as err:
             logger.error(f"Failed to contact Perfion API: {err}")
             raise ConnectionError("Unable to connect to Perfion API") from err
 
-        # Convert to list to allow two passes
-        product_data = list(result.data)
-
         # First pass: calculate base prices for price differentials
         self._calculate_base_prices(product_data)
         logger.info(f"Calculated base prices for {len(self.price_mapping)} products")
@@ -148,6 +173,38 @@ class PerfionAdapter(ThirdPartyAdapter):
             logger.debug(f"Processing product: {product_row}")
             yield product_row  # type: ignore
 
+    def _get_changed_products(self, since: datetime) -> List[ProductRow]:
+        """
+        Fetch every row of the ItemNumbers with a row modified since `since`.
+
+        A product is built from all its rows (colors, sizes, base price), so the unchanged
+        rows of a changed product are fetched as well. Only part of the catalogue is
+        loaded, which marks this adapter as partial. The rows are requested for a batch of
+        ItemNumbers at a time.
+        """
+        assert self.conn, "Connection must be established before reading products"
+
+        item_numbers = list(dict.fromkeys(
+            item_number
+            for row in self.conn.iter_products(total_pages=-1, modified_since=since)
+            if (item_number := row.get("ItemNumber"))
+        ))
+        logger.info(f"{len(item_numbers)} Perfion products changed since {since}")
+
+        self.partial = True
+        product_data: List[ProductRow] = []
+        for start in range(0, len(item_numbers), ITEM_NUMBERS_PER_QUERY):
+            product_data.extend(
+                cast(
+                    List[ProductRow],
+                    self.conn.iter_products(
+                        total_pages=-1,
+                        item_numbers=item_numbers[start:start + ITEM_NUMBERS_PER_QUERY],
+                    ),
+                )
+            )
+        return product_data
+
     def build_product_ids(self, row: ProductRow) -> dict[str, str]:
         """Extract product identification fields."""
         return {"productnumber": str(row.get("ItemNumber", ""))}
@@ -169,15 +226,17 @@ class PerfionAdapter(ThirdPartyAdapter):
             "meta_description": build_meta_description(row),
         }
 
-    def create_product(self, row: ProductRow, brand: str) -> ThirdPartyProduct:
-        """Create or retrieve a product from a data row."""
+    def create_product(
+        self, row: ProductRow, brand: str, attrs: Optional[dict[str, Any]] = None
+    ) -> ThirdPartyProduct:
+        """Create or retrieve a product from a data row, `attrs` are built when not given."""
         try:
             product, _ = cast(
                 Tuple[ThirdPartyProduct, bool],
                 self.get_or_instantiate(
                     model=self.product,
                     ids=self.build_product_ids(row),
-                    attrs=self.build_product_attrs(row, brand),
+                    attrs=attrs if attrs is not None else self.build_product_attrs(row, brand),
                 ),
             )
             return product
@@ -233,14 +292,12 @@ class PerfionAdapter(ThirdPartyAdapter):
         """
         Load and process all products from the Perfion API.
 
-        Orchestrates: fetching, filtering, creating/updating products, and adding variants.
+        Orchestrates: fetching, creating/updating products, and adding variants. Products
+        are filtered by the Perfion query, see `syncly.clients.perfion.query.ProductFilter`.
         """
         brand = normalize_string(self.settings.ccv_shop.brand)
 
         for row in self._get_products():
-            # if not self.should_process_product(row):
-            #    continue
-
             product = self.create_product(row, brand)
             self.add_variants(row, product)
 
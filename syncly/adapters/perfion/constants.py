@@ -5,3 +5,22 @@ DEFAULT_PACKAGE = "kartonnen doos"
 
 # SEO limits
 META_DESCRIPTION_MAX_LENGTH = 317
+
+# Perfion features read by this adapter, only these are requested
+PRODUCT_FEATURES = [
+    "ItemNumber",
+    "ItemName",
+    "Description",
+    "Category",
+    "ERPColor",
+    "TSizeNewDW",
+    "ERPGrossPrice1",
+    "BaseProductImageUrl",
+]
+
+# Seconds a changed-only run starts before the last successful run, covers clock skew
+# between this machine and the Perfion server
+MODIFIED_SINCE_OVERLAP = 10 * 60
+
+# ItemNumbers requested in one query when refetching changed products
+ITEM_NUMBERS_PER_QUERY = 100
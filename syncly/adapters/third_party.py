@@ -1,7 +1,11 @@
 import logging
+import multiprocessing
 import threading
 
 from abc import abstractmethod
+from collections import deque
+from itertools import islice
+from multiprocessing.pool import AsyncResult
 from time import sleep
 from concurrent.futures import ThreadPoolExecutor
 from diffsync import Adapter, DiffSyncModel
@@ -9,9 +13,12 @@ from diffsync.enum import DiffSyncModelFlags
 
 from requests.exceptions import RequestException
 from ..models.third_party import ThirdPartyProduct
-from typing import Optional, List, Any, Union, Generator, Type, Dict
+from typing import (
+    Optional, List, Any, Union, Generator, Iterable, Iterator, Type, Dict, Tuple, Deque, Set, cast
+)
 
 from ..settings import Settings
+from ..digest import DigestKey, compute_digests
 from ..models.base import (
     CategoryToDevice,
     AttributeValueToProduct,
@@ -21,10 +28,38 @@ from ..helpers import (
     normalize_string,
     base64_image_from_url,
     base64_image_from_url_contain,
+    in_shard,
+    report_progress,
+    ProgressCallback,
 )
 
 logger = logging.getLogger(__name__)
 
+ROWS_PER_CHUNK = 500  # Rows sent to a parse worker at a time
+
+# Adapter of a parse worker process, see `ThirdPartyAdapter.iter_product_attrs`
+_parse_adapter: Optional["ThirdPartyAdapter"] = None
+
+# Product ids and, for the first row of a product, its attributes
+BuiltRow = Tuple[Dict[str, str], Optional[Dict[str, Any]]]
+
+
+def _init_parse_worker(adapter_class: Type["ThirdPartyAdapter"], state: Dict[str, Any]) -> None:
+    """Create the adapter of a parse worker process from its `parse_state`."""
+    global _parse_adapter
+    _parse_adapter = adapter_class.from_parse_state(state)
+
+
+def _build_chunk(rows: List[Dict[str, Any]]) -> List[BuiltRow]:
+    """Build the product ids and attributes of a chunk of rows inside a worker process."""
+    assert _parse_adapter is not None, "Parse worker was not initialized"
+    return _parse_adapter.build_rows(rows, set())
+
+
+def shared_categories(settings: Settings) -> Set[str]:
+    """CCV categories every product is linked to, which can not be used as a shard category."""
+    return {settings.ccv_shop.root_category, *settings.ccv_shop.additional_categories}
+
 
 class ThirdPartyAdapter(Adapter):
     _lock = threading.Lock()
@@ -36,6 +71,10 @@ class ThirdPartyAdapter(Adapter):
 
     top_level = ["product"]
 
+    # Attributes `build_rows` reads that the constructor does not set from the settings,
+    # sent to the parse workers, see `parse_state`
+    parse_state_attributes: Tuple[str, ...] = ()
+
     def __str__(self) -> str:
         return "ThirdPartyAdapter"
 
@@ -44,12 +83,33 @@ class ThirdPartyAdapter(Adapter):
         *args,
         settings: Optional[Settings] = None,
         client: Optional[Any] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        shard_category: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+        parse_workers: int = 1,
         **kwargs,
     ):
         self.settings = settings or Settings()
         self.conn = client
         self.image_mode = "crop"
 
+        # Called with (stage, current, total) while loading
+        self.progress = progress
+
+        # Processes building the product attributes of rows, see `iter_product_attrs`
+        self.parse_workers = parse_workers
+
+        # Only products in this slice are processed, see `in_shard`
+        self.shard = shard
+        self.shard_category = shard_category
+
+        # Content digest per model, used by the diff to skip identical products
+        self.digests: Dict[DigestKey, str] = {}
+
+        # Set when only part of the catalogue is loaded, products missing from this
+        # adapter are then not deleted from the shop
+        self.partial = False
+
         # Commen mappings
         self.sizing_mapping = self.settings.mapping.size
         self.color_mapping = self.settings.mapping.color
@@ -148,6 +208,153 @@ class ThirdPartyAdapter(Adapter):
             if created:
                 self.add_child(product, product_photo)
 
+    @abstractmethod
+    def build_product_ids(self, row: Dict[str, Any]) -> Dict[str, str]:
+        """Extract the identifiers of the product of a row."""
+        pass
+
+    @abstractmethod
+    def build_product_attrs(self, row: Dict[str, Any], brand: str) -> Dict[str, Any]:
+        """Build the attributes of the product of a row."""
+        pass
+
+    def parse_state(self) -> Dict[str, Any]:
+        """
+        State the product ids and attributes are built from, sent to the parse workers.
+
+        The settings and the `parse_state_attributes`, e.g. base prices.
+        """
+        return {
+            "settings": self.settings,
+            **{name: getattr(self, name) for name in self.parse_state_attributes},
+        }
+
+    @classmethod
+    def from_parse_state(cls, state: Dict[str, Any]) -> "ThirdPartyAdapter":
+        """
+        Create the connection-less adapter a parse worker builds rows with.
+
+        The constructor runs without a client, so everything derived from the settings is
+        set as in the loading adapter, the `parse_state_attributes` are then copied over.
+
+        Raises:
+            ValueError: When the state misses the settings or one of the attributes.
+        """
+        missing = [
+            name for name in ("settings", *cls.parse_state_attributes) if name not in state
+        ]
+        if missing:
+            raise ValueError(f"Parse state of {cls.__name__} misses {', '.join(missing)}")
+
+        adapter = cls(settings=state["settings"])
+        for name in cls.parse_state_attributes:
+            setattr(adapter, name, state[name])
+        return adapter
+
+    def row_brand(self, row: Dict[str, Any]) -> str:
+        """Return the brand of the product of a row, the shop brand by default."""
+        return normalize_string(self.settings.ccv_shop.brand)
+
+    def build_rows(self, rows: List[Dict[str, Any]], seen: set) -> List[BuiltRow]:
+        """
+        Build the product ids of rows, and the attributes for the first row of each product.
+
+        Later rows of a product only add variants, so their attributes are never built.
+
+        Args:
+            rows: Rows in file order.
+            seen: Ids of the products already built, updated in place.
+        """
+        built: List[BuiltRow] = []
+        for row in rows:
+            ids = self.build_product_ids(row)
+            key = tuple(ids.items())
+            if key in seen:
+                built.append((ids, None))
+            else:
+                seen.add(key)
+                built.append((ids, self.build_product_attrs(row, self.row_brand(row))))
+        return built
+
+    def iter_product_attrs(
+        self, rows: Iterable[Dict[str, Any]]
+    ) -> Iterator[Tuple[Dict[str, Any], Dict[str, str], Optional[Dict[str, Any]]]]:
+        """
+        Lazily yield (row, ids, attrs) in row order, attrs only for the first row of a product.
+
+        With more than one parse worker the rows are split into chunks which are built in
+        worker processes, a few chunks ahead of the rows being yielded. The workers are
+        started fresh (forkserver or spawn), as sources load next to threads that may hold
+        locks, and get the `parse_state` of this adapter as it is when the first chunk was
+        read. State the attributes depend on (e.g. base prices) should be complete by then.
+        """
+        seen: set = set()
+        rows = iter(rows)
+        chunks = iter(lambda: list(islice(rows, ROWS_PER_CHUNK)), [])
+
+        if self.parse_workers <= 1:
+            for chunk in chunks:
+                yield from (
+                    (row, ids, attrs)
+                    for row, (ids, attrs) in zip(chunk, self.build_rows(chunk, seen))
+                )
+            return
+
+        first = next(chunks, None)
+        if first is None:
+            return
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        with context.Pool(
+            processes=self.parse_workers,
+            initializer=_init_parse_worker,
+            initargs=(type(self), self.parse_state()),
+        ) as pool:
+            pending: Deque[Tuple[List[Dict[str, Any]], AsyncResult[List[BuiltRow]]]] = deque()
+
+            def submit(chunk: List[Dict[str, Any]]) -> None:
+                pending.append((chunk, pool.apply_async(_build_chunk, (chunk,))))
+
+            submit(first)
+            for chunk in chunks:
+                submit(chunk)
+                if len(pending) < self.parse_workers * 2:
+                    continue
+                yield from self._merge_built(*pending.popleft(), seen)
+
+            while pending:
+                yield from self._merge_built(*pending.popleft(), seen)
+
+    @staticmethod
+    def _merge_built(
+        chunk: List[Dict[str, Any]], result: "AsyncResult[List[BuiltRow]]", seen: set
+    ) -> Iterator[Tuple[Dict[str, Any], Dict[str, str], Optional[Dict[str, Any]]]]:
+        # Workers only know their own chunk, a product started in an earlier chunk is not new
+        for row, (ids, attrs) in zip(chunk, result.get()):
+            key = tuple(ids.items())
+            if key in seen:
+                attrs = None
+            elif attrs is not None:
+                seen.add(key)
+            yield row, ids, attrs
+
+    def get_or_create_product(
+        self, row: Dict[str, Any], ids: Dict[str, str], attrs: Optional[Dict[str, Any]]
+    ) -> ThirdPartyProduct:
+        """Return the product of a row built by `iter_product_attrs`, creating it for its first row."""
+        if attrs is None:
+            return cast(ThirdPartyProduct, self.get(self.product, ids))
+
+        return self.create_product(row, self.row_brand(row), attrs=attrs)
+
+    @abstractmethod
+    def create_product(
+        self, row: Dict[str, Any], brand: str, attrs: Optional[Dict[str, Any]] = None
+    ) -> ThirdPartyProduct:
+        """Create or retrieve a product from a data row, with its attributes when already built."""
+        pass
+
     @abstractmethod
     def load_products(self) -> List[ThirdPartyProduct]:
         pass
@@ -173,6 +380,27 @@ class ThirdPartyAdapter(Adapter):
         )
         self.process_images(product, self.image_mode)
 
+    def in_shard(self, product: ThirdPartyProduct) -> bool:
+        """
+        Check if a product belongs to the shard this adapter is loading.
+
+        Products are matched on a hash of their productnumber and, when a shard category
+        is set, on that category being one of the CCV categories they are mapped to. The
+        root and additional categories every product gets are not matched, see
+        `shared_categories`.
+        """
+        if not in_shard(product.productnumber, self.shard):
+            return False
+
+        if self.shard_category:
+            categories = {self.category_mapping.get(cat) for cat in product.category}
+            return self.shard_category in categories - shared_categories(self.settings)
+
+        return True
+
+    def synced(self) -> None:
+        """Called once the diff of this adapter was synced to the shop."""
+
     def add_child(self, parent: DiffSyncModel, child: DiffSyncModel):
         """
         Helper Function to be able to add child objects safely while multithreading
@@ -187,7 +415,21 @@ class ThirdPartyAdapter(Adapter):
         This method serves as the entry point for loading products and their associated
         data into the adapter.
         """
+        report_progress(self.progress, "Loading products")
+        products = []
+        for product in self.load_products():
+            if self.in_shard(product):
+                products.append(product)
+            else:
+                self.remove(product)
+
+        if self.shard or self.shard_category:
+            logger.info(f"Processing {len(products)} products in shard {self.shard} {self.shard_category or ''}")
+
         # Process products using a worker pool
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            results = executor.map(self.process_single_product, self.load_products())
-            list(results)
+        with ThreadPoolExecutor(max_workers=5, thread_name_prefix=str(self)) as executor:
+            results = executor.map(self.process_single_product, products)
+            for done, _ in enumerate(results, start=1):
+                report_progress(self.progress, "Processing products", done, len(products))
+
+        self.digests = compute_digests(self)
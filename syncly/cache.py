@@ -0,0 +1,127 @@
+"""
+On-disk cache for data that rarely changes between runs.
+
+Every key is stored as its own JSON file under `<directory>/<namespace>/`, the file
+modification time is used to expire entries after `ttl` seconds. Files are written to a
+temporary file first and moved in place, so concurrent runs never read half written data.
+
+`MemoryCache` keeps the entries of a single run in memory, optionally on top of a file cache,
+so adapters working on the same shop in one process share what was already fetched.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def hash_key(value: str) -> str:
+    """Create a stable, filesystem safe key from an arbitrary string."""
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+
+class FileCache:
+    def __init__(self, directory: str, namespace: str, ttl: int):
+        """
+        Initialize a file cache.
+
+        Args:
+            directory: Base directory of the cache, `~` is expanded.
+            namespace: Sub directory separating unrelated caches, e.g. one per shop.
+            ttl: Seconds after which an entry is considered expired.
+        """
+        self.path = Path(directory).expanduser() / namespace
+        self.ttl = ttl
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{hash_key(key)}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value of `key`, or None when it is missing or expired."""
+        file = self._file(key)
+        try:
+            age = time.time() - file.stat().st_mtime
+            if age > self.ttl:
+                logger.debug(f"Cache entry {key} expired {int(age - self.ttl)}s ago")
+                return None
+
+            with open(file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {key}: {e}")
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` under `key`, failures are logged and otherwise ignored."""
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp, self._file(key))
+        except (OSError, TypeError) as e:
+            logger.warning(f"Failed to write cache entry {key}: {e}")
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Remove a single entry, or every entry in this namespace when no key is given."""
+        files = [self._file(key)] if key else list(self.path.glob("*.json"))
+        for file in files:
+            try:
+                file.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to remove cache entry {file}: {e}")
+
+
+class MemoryCache:
+    def __init__(self, backing: Optional[FileCache] = None):
+        """
+        Initialize an in-memory cache, shared between adapters of a single run.
+
+        Args:
+            backing: Optional file cache read on a miss and written through on set.
+        """
+        self.backing = backing
+        self._data: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the value of `key` from memory, or from the backing cache on a miss."""
+        with self._lock:
+            if key in self._data:
+                return self._data[key]
+
+        value = self.backing.get(key) if self.backing else None
+        if value is not None:
+            with self._lock:
+                self._data.setdefault(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` under `key` in memory and in the backing cache."""
+        with self._lock:
+            self._data[key] = value
+
+        if self.backing:
+            self.backing.set(key, value)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Remove a single entry, or every entry when no key is given."""
+        with self._lock:
+            if key:
+                self._data.pop(key, None)
+            else:
+                self._data.clear()
+
+        if self.backing:
+            self.backing.invalidate(key)
@@ -51,5 +51,17 @@ def main():
     ccv.sync_elten.add_arguments(sync_elten_parser)
     sync_elten_parser.set_defaults(func=ccv.sync_elten.handle)
 
+    sync_all_parser = ccv_subparsers.add_parser(
+        "sync-all", help="Syncs several suppliers to CCV Shop sharing one shop load"
+    )
+    ccv.sync_all.add_arguments(sync_all_parser)
+    sync_all_parser.set_defaults(func=ccv.sync_all.handle)
+
+    apply_parser = ccv_subparsers.add_parser(
+        "apply", help="Applies a diff saved with --output to CCV Shop"
+    )
+    ccv.apply.add_arguments(apply_parser)
+    apply_parser.set_defaults(func=ccv.apply.handle)
+
     args = parser.parse_args()
     args.func(args, console)
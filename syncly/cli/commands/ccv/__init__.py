@@ -1,15 +1,19 @@
 from . import (
+    apply,
     create_attribute_set_from_txt,
     sync_perfion,
     sync_mascot,
     sync_hydrowear,
     sync_elten,
+    sync_all,
 )
 
 __all__ = [
+    "apply",
     "create_attribute_set_from_txt",
     "sync_perfion",
     "sync_mascot",
     "sync_hydrowear",
     "sync_elten",
+    "sync_all",
 ]
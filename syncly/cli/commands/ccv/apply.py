@@ -0,0 +1,83 @@
+"""
+CLI command for applying a diff saved with `sync-* --output` to CCVShop.
+
+Only the (cached) reference data of the shop is loaded, the objects touched by the diff
+are restored from the ids stored in the file, so neither side is loaded again.
+"""
+
+import logging
+import os
+
+from diffsync import Adapter
+from diffsync.enum import DiffSyncFlags
+from diffsync.logging import enable_console_logging
+from ....diff_file import read_diff
+from ....settings import load_settings
+from ....helpers import get_env, load_env_files
+from ...pipeline import create_destination
+from ...render import render_diff
+
+logger = logging.getLogger(__name__)
+
+
+def add_arguments(parser):
+    """
+    Add CLI arguments for the apply command.
+
+    Args:
+        parser (argparse.ArgumentParser): The argument parser to add arguments to.
+    """
+    parser.add_argument(
+        "diff_file",
+        type=str,
+        help="Diff file written by a sync command with -o/--output",
+    )
+
+    parser.add_argument(
+        "-c", "--config",
+        type=str,
+        help="Path to configuration file",
+        default=None
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only show the diff, don't apply it",
+        default=False,
+    )
+
+
+def handle(args, console):
+    """
+    Handle the apply CLI command.
+
+    Args:
+        args: Parsed CLI arguments.
+        console: Rich console for output.
+    """
+    if not os.path.isfile(args.diff_file):
+        console.print(f"[red]Diff file not found: {args.diff_file}[/red]")
+        return
+
+    if args.config:
+        load_env_files(args.config)
+
+    logger.info(f"Reading diff from {args.diff_file}")
+    diff_file = read_diff(args.diff_file)
+    render_diff(diff_file.diff, console)
+
+    if args.dry_run:
+        return
+
+    settings = load_settings(get_env("SYNCLY_SETTINGS", "settings.yaml"))
+    dst = create_destination(settings)
+    dst.load_references()
+    dst.load_existing(diff_file.existing)
+
+    # The source side is only used for model flags during the sync, nothing is looked up
+    src = Adapter(name=diff_file.header.get("source"))
+
+    enable_console_logging(verbosity=3)
+    console.print("Syncing...")
+    dst.sync_from(src, diff=diff_file.diff, flags=DiffSyncFlags.CONTINUE_ON_FAILURE)
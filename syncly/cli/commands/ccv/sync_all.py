@@ -0,0 +1,194 @@
+"""
+CLI command for running several supplier syncs against one CCVShop in a single run.
+
+The batch file lists the suppliers to sync, e.g.
+
+    env_files: [.env]
+    pipelines:
+      - supplier: mascot
+        settings: settings/mascot.yaml
+      - supplier: hydrowear
+        settings: settings/hydrowear.yaml
+        file: data/hydrowear.xlsx
+
+The CCV reference data (brands, packages, categories, attributes) is loaded once and shared,
+all sources and destinations load at the same time and every request to the shop goes
+through one rate limiter. Diffs are calculated and synced one supplier after another.
+"""
+
+import logging
+import os
+from typing import Callable, Dict, List, Optional
+
+import yaml
+from pydantic import BaseModel, Field
+
+from ....adapters.ccv import CCVShopAdapter
+from ....adapters.ccv.constants import API_RATE_LIMIT_DELAY
+from ....cache import MemoryCache
+from ....clients.rate_limit import RateLimiter
+from ....helpers import load_env_files
+from ....settings import Settings, use_settings
+from ... import pipeline
+from . import sync_elten, sync_hydrowear, sync_mascot, sync_perfion
+
+logger = logging.getLogger(__name__)
+
+SUPPLIERS: Dict[str, Callable[..., object]] = {
+    "mascot": sync_mascot.create_source,
+    "hydrowear": sync_hydrowear.create_source,
+    "elten": sync_elten.create_source,
+    "perfion": sync_perfion.create_source,
+}
+
+# Suppliers reading a local file, `PipelineConfig.file`
+FILE_SUPPLIERS = {"hydrowear", "elten"}
+
+
+class PipelineConfig(BaseModel):
+    supplier: str
+    settings: str  # Settings YAML of this supplier, e.g. its root category and mappings
+    name: str = ""
+    file: Optional[str] = None  # Supplier file, for hydrowear and elten
+    pictures: Optional[str] = None  # Pictures folder, for elten
+    changed_only: bool = False  # Only sync products changed since the last successful run, for perfion
+    parse_workers: int = 1  # Processes building the products of file rows, for mascot, hydrowear and elten
+
+
+class BatchConfig(BaseModel):
+    env_files: List[str] = Field(default_factory=list)
+    pipelines: List[PipelineConfig] = Field(default_factory=list)
+
+
+def add_arguments(parser):
+    """
+    Add CLI arguments for the sync-all command.
+
+    Args:
+        parser (argparse.ArgumentParser): The argument parser to add arguments to.
+    """
+    parser.add_argument(
+        "-c", "--config",
+        type=str,
+        help="Path to the batch file listing the supplier pipelines",
+        required=True,
+    )
+
+    parser.add_argument(
+        "-s", "--sync",
+        action="store_true",
+        help="Perform sync operation",
+        default=False
+    )
+
+    parser.add_argument(
+        "-o", "--output-dir",
+        type=str,
+        help="Write the diff of every pipeline as <name>.jsonl.gz to this directory",
+        default=None
+    )
+
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Drop the cached CCV reference data (brands, packages, categories, attributes) before loading",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--diff-workers",
+        type=int,
+        help="Number of processes to calculate the diff with, products are split between them",
+        default=1,
+    )
+
+
+def load_batch(path: str) -> BatchConfig:
+    """
+    Read and validate a batch file.
+
+    Raises:
+        ValueError: When a pipeline uses an unknown supplier, misses the file its supplier
+            reads or names are not unique.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        batch = BatchConfig(**(yaml.safe_load(f) or {}))
+
+    names = set()
+    for config in batch.pipelines:
+        if config.supplier not in SUPPLIERS:
+            raise ValueError(
+                f"Unknown supplier {config.supplier}, expected one of {', '.join(SUPPLIERS)}"
+            )
+        if config.supplier in FILE_SUPPLIERS and not config.file:
+            raise ValueError(f"Pipeline of supplier {config.supplier} needs a file")
+        config.name = config.name or config.supplier
+        if config.name in names:
+            raise ValueError(f"Pipeline name {config.name} is used twice, give each a unique name")
+        names.add(config.name)
+
+    return batch
+
+
+def handle(args, console):
+    """
+    Handle the sync-all CLI command.
+
+    Args:
+        args: Parsed CLI arguments.
+        console: Rich console for output.
+    """
+    batch = load_batch(args.config)
+    if not batch.pipelines:
+        console.print("[yellow]No pipelines defined in the batch file[/yellow]")
+        return
+
+    if batch.env_files:
+        load_env_files(*batch.env_files)
+
+    settings: Dict[str, Settings] = {
+        config.name: Settings.from_yaml(config.settings) for config in batch.pipelines
+    }
+    urls = {s.ccv_shop.url for s in settings.values()}
+    if len(urls) != 1:
+        raise ValueError(f"All pipelines should sync to the same shop, found: {', '.join(urls)}")
+
+    shared_settings = next(iter(settings.values()))
+    client = pipeline.create_client(shared_settings, RateLimiter(API_RATE_LIMIT_DELAY))
+    cache = MemoryCache(CCVShopAdapter.create_reference_cache(shared_settings))
+    if args.refresh_cache:
+        cache.invalidate()
+
+    with pipeline.stage("Loading shared reference data"):
+        pipeline.create_destination(shared_settings, client=client, cache=cache).load_references()
+
+    sources, destinations = {}, {}
+    for config in batch.pipelines:
+        sources[config.name] = SUPPLIERS[config.supplier](config, settings[config.name])
+        destinations[config.name] = pipeline.create_destination(
+            settings[config.name], client=client, cache=cache
+        )
+
+    adapters = []
+    for name in sources:
+        adapters.append((f"{name}: {sources[name]}", sources[name]))
+        adapters.append((f"{name}: {destinations[name]}", destinations[name]))
+
+    with pipeline.stage("Loading all sources and destinations"):
+        pipeline.load_adapters(adapters, console)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    for name in sources:
+        # The attribute ordering of the diff reads the active settings
+        use_settings(settings[name])
+        console.rule(name)
+        pipeline.diff_and_sync(
+            sources[name],
+            destinations[name],
+            console,
+            diff_workers=args.diff_workers,
+            output=os.path.join(args.output_dir, f"{name}.jsonl.gz") if args.output_dir else None,
+            sync=args.sync,
+        )
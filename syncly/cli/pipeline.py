@@ -0,0 +1,318 @@
+"""
+Shared sync pipeline of the `ccv sync-*` commands.
+
+A command only knows how to create its source adapter, everything else is done here:
+creating the CCVShop destination, loading both sides at the same time, calculating and
+rendering the diff, writing it to a file and syncing it.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Sequence, Tuple
+
+from diffsync import Adapter
+from diffsync.diff import Diff
+from diffsync.enum import DiffSyncFlags
+from diffsync.logging import enable_console_logging
+from rich.console import Console
+from rich.progress import (
+    BarColumn,
+    MofNCompleteColumn,
+    Progress,
+    TaskID,
+    TextColumn,
+    TimeElapsedColumn,
+)
+
+from ..adapters.ccv import CCVShopAdapter
+from ..adapters.third_party import ThirdPartyAdapter, shared_categories
+from ..clients.ccv.client import CCVClient
+from ..clients.rate_limit import RateLimiter
+from ..diff import (
+    AttributeOrderingDiff,
+    count_unapplied,
+    parallel_diff,
+    skip_unmatched_top_level,
+)
+from ..diff_file import write_diff
+from ..helpers import get_env, load_env_files, parse_shard, ProgressCallback
+from ..settings import Settings, load_settings
+from .render import render_diff
+
+logger = logging.getLogger(__name__)
+
+# Creates the source adapter of a command: (options, settings, **adapter kwargs) -> Adapter
+SourceFactory = Callable[..., Adapter]
+
+
+def add_arguments(parser):
+    """
+    Add the CLI arguments shared by every sync command.
+
+    Args:
+        parser (argparse.ArgumentParser): The argument parser to add arguments to.
+    """
+    parser.add_argument(
+        "-c", "--config",
+        type=str,
+        help="Path to configuration file",
+        default=None
+    )
+
+    parser.add_argument(
+        "-s", "--sync",
+        action="store_true",
+        help="Perform sync operation",
+        default=False
+    )
+
+    parser.add_argument(
+        "-v", "--verbose",
+        action="count",
+        default=0,
+        help="Increase verbosity level (e.g., -v, -vv, -vvv)"
+    )
+
+    parser.add_argument(
+        "-o", "--output",
+        type=str,
+        help="Write the diff as JSON lines to this file, gzip compressed when it ends in .gz",
+        default=None
+    )
+
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        help="Only sync the products in this shard, e.g. 3/8, based on a hash of the productnumber",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--shard-category",
+        type=str,
+        help="Only sync the products in this CCV category",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Drop the cached CCV reference data (brands, packages, categories, attributes) before loading",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--diff-workers",
+        type=int,
+        help="Number of processes to calculate the diff with, products are split between them",
+        default=1,
+    )
+
+
+def add_parse_arguments(parser):
+    """
+    Add the arguments of commands whose source parses a supplier file.
+
+    Args:
+        parser (argparse.ArgumentParser): The argument parser to add arguments to.
+    """
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        help="Number of processes to build the products of supplier file rows with",
+        default=1,
+    )
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Log how long a stage of the pipeline took."""
+    start = time.perf_counter()
+    logger.info(f"{name}...")
+    try:
+        yield
+    finally:
+        logger.info(f"{name} took {time.perf_counter() - start:.1f}s")
+
+
+def create_client(settings: Settings, rate_limiter: Optional[RateLimiter] = None) -> CCVClient:
+    """Create a CCVShop client from the environment and settings."""
+    return CCVClient(
+        get_env("CCVSHOP_PUBLIC_KEY"),
+        get_env("CCVSHOP_PRIVATE_KEY"),
+        settings.ccv_shop.url,
+        rate_limiter=rate_limiter,
+    )
+
+
+def create_destination(
+    settings: Settings, client: Optional[CCVClient] = None, **kwargs: Any
+) -> CCVShopAdapter:
+    """Create the CCVShop destination adapter, with a new client unless one is given."""
+    return CCVShopAdapter(
+        settings=settings,
+        client=client or create_client(settings),
+        **kwargs,
+    )
+
+
+def _load(adapter: Adapter) -> Adapter:
+    with stage(f"Loading {adapter}"):
+        adapter.load()
+    return adapter
+
+
+def _progress_callback(progress: Progress, task_id: TaskID, name: str) -> ProgressCallback:
+    def callback(stage: str, current: int, total: int) -> None:
+        progress.update(
+            task_id, description=f"{name}: {stage}", completed=current, total=total or None
+        )
+
+    return callback
+
+
+def load_adapters(
+    adapters: Sequence[Tuple[str, Adapter]], console: Optional[Console] = None
+) -> None:
+    """
+    Load adapters at the same time, showing the progress of each.
+
+    Both sides mostly wait on the network (FTP, SOAP, REST), so threads are enough to
+    overlap them, each adapter keeps its own worker pool. The first error is raised once
+    all adapters have finished.
+
+    Args:
+        adapters: (label, adapter) pairs, the label is shown in the progress display.
+        console: Rich console to show the progress on.
+    """
+    columns = (
+        TextColumn("{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeElapsedColumn(),
+    )
+    with Progress(*columns, console=console) as progress:
+
+        def load(label: str, adapter: Adapter) -> Adapter:
+            task_id = progress.add_task(label, total=None)
+            adapter.progress = _progress_callback(progress, task_id, label)
+            _load(adapter)
+            progress.update(task_id, description=f"{label}: done", completed=1, total=1)
+            return adapter
+
+        with ThreadPoolExecutor(max_workers=len(adapters), thread_name_prefix="load") as pool:
+            futures = [pool.submit(load, label, adapter) for label, adapter in adapters]
+            for future in futures:
+                future.result()
+
+
+def diff_and_sync(
+    src: Adapter,
+    dst: CCVShopAdapter,
+    console: Console,
+    diff_workers: int = 1,
+    output: Optional[str] = None,
+    sync: bool = False,
+) -> Diff:
+    """
+    Calculate and render the diff of two loaded adapters, optionally write and sync it.
+
+    Shop products missing from a partial source are left alone instead of being deleted.
+    The source is told it synced only when every change was applied.
+
+    Args:
+        src: The loaded source adapter.
+        dst: The loaded CCVShop adapter.
+        console: Rich console for output.
+        diff_workers: Number of processes to calculate the diff with.
+        output: File to write the diff to.
+        sync: Apply the diff to the destination.
+
+    Returns:
+        Diff: The calculated diff.
+    """
+    if isinstance(src, ThirdPartyAdapter) and src.partial:
+        skipped = skip_unmatched_top_level(src, dst)
+        logger.info(f"Leaving {skipped} products that are not in the partial source alone")
+
+    with stage("Creating diff"):
+        diff = parallel_diff(
+            src, dst, diff_class=AttributeOrderingDiff, workers=diff_workers
+        )
+
+    render_diff(diff, console)
+
+    if output:
+        changes = write_diff(diff, output, destination=dst, source=src.name)
+        console.print(f"Wrote {changes} changes to {output}")
+
+    if sync:
+        enable_console_logging(verbosity=3)
+        console.print("Syncing...")
+        with stage("Syncing"):
+            src.sync_to(dst, diff=diff, flags=DiffSyncFlags.CONTINUE_ON_FAILURE)
+
+        # A later changed-only run would skip the products that failed to sync
+        unapplied = count_unapplied(diff, dst)
+        if unapplied:
+            console.print(f"[yellow]{unapplied} changes failed to sync[/yellow]")
+        elif isinstance(src, ThirdPartyAdapter):
+            src.synced()
+
+    return diff
+
+
+def run(args, console: Console, create_source: SourceFactory) -> Diff:
+    """
+    Run a sync command.
+
+    Args:
+        args: Parsed CLI arguments, see `add_arguments`.
+        console: Rich console for output.
+        create_source: Creates the source adapter of the command.
+
+    Returns:
+        Diff: The calculated diff.
+    """
+    if args.config:
+        load_env_files(args.config)
+
+    settings = load_settings(get_env("SYNCLY_SETTINGS", "settings.yaml"))
+    if args.shard_category in shared_categories(settings):
+        raise ValueError(
+            f"Shard category {args.shard_category} is shared by every product, "
+            f"use a mapped category instead"
+        )
+
+    shard_kwargs = {"shard": args.shard, "shard_category": args.shard_category}
+    src = create_source(args, settings, **shard_kwargs)
+    dst = create_destination(settings, **shard_kwargs)
+
+    if args.refresh_cache and dst.cache:
+        dst.cache.invalidate()
+
+    with stage("Loading source and destination"):
+        load_adapters([(str(src), src), (str(dst), dst)], console)
+
+    if args.shard_category:
+        # Products of the shard that exist in the shop, but are not linked to the category yet
+        missing = {
+            product.productnumber
+            for product in src.get_all(src.product)
+            if dst.get_or_none(dst.product, product.get_unique_id()) is None
+        }
+        if missing:
+            with stage("Loading unlinked products"):
+                loaded = dst.load_unlinked_products(missing)
+            console.print(f"Loaded {loaded} products not linked to the shard category yet")
+
+    return diff_and_sync(
+        src,
+        dst,
+        console,
+        diff_workers=args.diff_workers,
+        output=args.output,
+        sync=args.sync,
+    )
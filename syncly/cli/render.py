@@ -0,0 +1,96 @@
+"""
+Streaming rendering of DiffSync diffs.
+
+Lines are produced while walking the Diff, so nothing is materialized up front and the
+first changes are printed right away, even for diffs with thousands of products.
+"""
+
+import reprlib
+from typing import Any, Iterator
+
+from diffsync.diff import Diff
+from rich.console import Console
+from rich.text import Text
+
+TRUNCATE_LENGTH = 200
+TRUNCATE_ITEMS = 20  # Items of a list or dict value shown before "..."
+
+# Limits the text of non-string values while it is built, instead of slicing a full str()
+_value_repr = reprlib.Repr()
+_value_repr.maxstring = _value_repr.maxother = TRUNCATE_LENGTH
+_value_repr.maxlist = _value_repr.maxtuple = _value_repr.maxset = TRUNCATE_ITEMS
+_value_repr.maxdict = TRUNCATE_ITEMS
+
+
+def truncate(value: Any, length: int = TRUNCATE_LENGTH) -> str:
+    """Shorten a value for display, strings are sliced before anything is copied."""
+    text = value if isinstance(value, str) else _value_repr.repr(value)
+    if len(text) > length:
+        return f"{text[:length]}..."
+
+    return text
+
+
+def iter_diff_lines(diff: Diff, indent: int = 0) -> Iterator[Text]:
+    """
+    Lazily yield Rich Text lines describing a diff and its children.
+
+    Args:
+        diff (Diff): The diff to render.
+        indent (int): Current indentation level.
+
+    Yields:
+        Text: One line of output at a time.
+    """
+    ind = "  " * indent
+    current_type = None
+    for element in diff.get_children():
+        if not element.has_diffs(include_children=True):
+            continue
+
+        if element.type != current_type:
+            current_type = element.type
+            yield Text(f"{ind}* {element.type}")
+
+        child = element.name
+        attrs_diffs = element.get_attrs_diffs()
+        plus = attrs_diffs.get("+", {})
+        minus = attrs_diffs.get("-", {})
+        has_plus = "+" in attrs_diffs
+        has_minus = "-" in attrs_diffs
+        if has_plus and not has_minus:
+            yield Text(f"{ind}  + {child}", style="green")
+            for attr, value in plus.items():
+                yield Text(f"{ind}    + {attr}: {truncate(value)}", style="green")
+        elif has_minus and not has_plus:
+            yield Text(f"{ind}  - {child}", style="red")
+            for attr, value in minus.items():
+                yield Text(f"{ind}    - {attr}: {truncate(value)}", style="red")
+        elif not has_plus and not has_minus:
+            yield Text(f"{ind}  * {child}", style="dim")
+        else:
+            yield Text(f"{ind}  ! {child}", style="yellow")
+            for attr, value in plus.items():
+                yield Text(f"{ind}    + {attr}: {truncate(value)}", style="green")
+            for attr, value in minus.items():
+                yield Text(f"{ind}    - {attr}: {truncate(value)}", style="red")
+
+        # Recurse into nested diffs
+        if element.child_diff.has_diffs():
+            yield from iter_diff_lines(element.child_diff, indent + 2)
+
+
+def render_diff(diff: Diff, console: Console) -> None:
+    """Print a diff and its summary to the console line by line."""
+    console.print("-" * 30 + " Diff Details " + "-" * 30)
+    if not diff.has_diffs():
+        console.print("No Changes to be Made")
+    else:
+        for line in iter_diff_lines(diff):
+            console.print(line)
+
+    summary = diff.summary()
+    summary_str = " | ".join(f"{key}: {value}" for key, value in summary.items())
+    divider = "-" * 28 + " Sync Summary " + "-" * 28
+    console.print(divider)
+    console.print(f"[bold magenta]Sync Summary:[/bold magenta] {summary_str}")
@@ -1,5 +1,5 @@
 from .endpoint import CCVApiEndpoints
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Sequence
 
 class ProductEndpoint(CCVApiEndpoints):
 
@@ -21,8 +21,8 @@ class ProductEndpoint(CCVApiEndpoints):
     def get_products(self, per_page=100, total_pages=1, **params: Any):
         return self.client._get_paged("/api/rest/v1/products", per_page, total_pages, **params)
 
-    def get_products_by_categories(self, id:str, per_page=100, total_pages=1, **params: Any):
-        return self.client._get_paged(f"/api/rest/v1/categories/{id}/products", per_page, total_pages, **params)
+    def get_products_by_categories(self, id:str, per_page=100, total_pages=1, fields: Optional[Sequence[str]] = None, **params: Any):
+        return self.client._get_paged(f"/api/rest/v1/categories/{id}/products", per_page, total_pages, fields=fields, **params)
 
     def get_products_by_brands(self, id: str, per_page=100, total_pages=1, **params: Any):
         return self.client._get_paged(f"/api/rest/v1/brands/{id}/products", per_page, total_pages, **params)
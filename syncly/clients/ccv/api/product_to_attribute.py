@@ -1,6 +1,5 @@
-from re import A
 from .endpoint import CCVApiEndpoints
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Union
 
 
 class ProductToAttributeEndpoint(CCVApiEndpoints):
@@ -16,6 +15,22 @@ class ProductToAttributeEndpoint(CCVApiEndpoints):
             total_pages=total_pages,
         )
 
+    def iter_product_to_attribute_values(
+        self, id: str, size_hint: int = 250, total_pages: Union[str, int] = -1
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over all attribute values of a product, page by page.
+
+        `size_hint` is the expected number of values and is used as page size, so
+        a correct hint fetches everything in a single request.
+        """
+        for page in self.client._iter_paged(
+            f"/api/rest/v1/products/{id}/productattributevalues",
+            per_page=size_hint,
+            total_pages=total_pages,
+        ):
+            yield from (page.data or {}).get("items", [])
+
     def create_product_attribute_values(self, id: str, body: Dict[str, Any]):
         return self.client._post(
             f"/api/rest/v1/products/{id}/productattributevalues", body
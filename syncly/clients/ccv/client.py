@@ -5,8 +5,9 @@ import time
 from requests.exceptions import ConnectionError, Timeout, RequestException
 from urllib3.exceptions import ProtocolError
 
-from typing import Dict, Optional, Any, Union
+from typing import Dict, Optional, Any, Union, Sequence, Iterator, cast
 from .auth import CCVAuth
+from ..rate_limit import RateLimiter
 
 # TODO: Consuludate this all into like one __init__ file cause this is a bit "extra"
 from .api.product import ProductEndpoint
@@ -21,13 +22,18 @@ from .api.brands import BrandEndpoint
 from .models import CCVShopResult
 
 logger = logging.getLogger(__name__)
+
+MAX_PER_PAGE = 250  # Largest page size the CCV Shop API accepts
+
+
 class CCVClient():
 
     def __init__(self,
                  public_key: str,
                  secret_key: str,
                  base_url: Optional[str] = None,
-                 verify_ssl: bool = True):
+                 verify_ssl: bool = True,
+                 rate_limiter: Optional[RateLimiter] = None):
 
         if not public_key or not secret_key:
             raise ValueError("public_key and or secret_key should be passed or defined in environment Variables or passed through config")
@@ -43,6 +49,9 @@ class CCVClient():
 
         self.verifiy_ssl = verify_ssl
 
+        # Optional, shared between clients that talk to the same shop
+        self.rate_limiter = rate_limiter
+
         self.product = ProductEndpoint(self)
         self.categories = CategoryEndpoint(self)
         self.packages = PackageEndpoint(self)
@@ -75,6 +84,9 @@ class CCVClient():
             except json.decoder.JSONDecodeError:
                 raise ValueError(f"Body: {body} couldn't be decoded into json, if you want to send a non decodable body, or raw  ")
 
+        if self.rate_limiter:
+            self.rate_limiter.wait()
+
         # Try to make the request with connection error handling
         try:
             resp = requests.request(
@@ -217,21 +229,30 @@ class CCVClient():
             uri=uri_path,
         )
 
-    def _get_paged(self, uri_path: str, per_page: int, total_pages: Union[str, int], **params: Any):
+    def _iter_paged(
+        self,
+        uri_path: str,
+        per_page: int,
+        total_pages: Union[str, int],
+        fields: Optional[Sequence[str]] = None,
+        **params: Any
+    ) -> Iterator[CCVShopResult]:
         """
-        Fetch paginated results from a CCV Shop API endpoint.
+        Lazily iterate over the pages of a CCV Shop API endpoint.
 
-        This helper performs multiple GET requests to retrieve paginated data. It supports
-        both a fixed number of pages or automatic pagination by setting total_pages="all".
+        Each yielded result holds the raw page response, the next page is only requested
+        once the previous one has been consumed.
 
         Args:
             uri_path: The relative URI path to request (e.g., "products").
             per_page: Number of items per request (min 1, max 250).
             total_pages: Number of pages to retrieve, or "all" to fetch until 'next' is empty.
+            fields: Optional list of item fields to request, sent as a comma separated
+                `fields` query parameter so the API only returns what is needed.
             **params: Additional query parameters to pass to the request.
 
-        Returns:
-            CCVShopResult: Combined result with all paginated items in result.data["items"].
+        Yields:
+            CCVShopResult: One result per page, items are in result.data["items"].
         """
 
         if isinstance(total_pages, str):
@@ -242,28 +263,27 @@ class CCVClient():
         elif isinstance(total_pages, int) and (total_pages < -1 or total_pages == 0):
             raise ValueError("Total Pages cannot be below -1 or 0 when int")
 
-        per_page = max(1, min(per_page, 250))
+        if fields:
+            params = {**params, "fields": ",".join(fields)}
+
+        per_page = max(1, min(per_page, MAX_PER_PAGE))
         start = 0
-        results = []
         pages = 0
 
-        status_code = -1
-
         while pages < total_pages or total_pages == -1:
             paging_params = {
                 "start": start,
                 "size": per_page,
             }
             result = self._get(uri_path, **{**params, **paging_params})
-            status_code = result.status_code
 
             if not result.data:
                 raise ValueError("Something unexpected happend")
 
-            items = result.data.get("items")
-            if items is None:
+            if result.data.get("items") is None:
                 raise ValueError("Expected 'items' field missing in response")
-            results.extend(items)
+
+            yield result
 
             pages += 1
             next_link = result.data.get("next")
@@ -273,6 +293,40 @@ class CCVClient():
 
             start += per_page
 
+    def _get_paged(
+        self,
+        uri_path: str,
+        per_page: int,
+        total_pages: Union[str, int],
+        fields: Optional[Sequence[str]] = None,
+        **params: Any
+    ):
+        """
+        Fetch paginated results from a CCV Shop API endpoint.
+
+        This helper performs multiple GET requests to retrieve paginated data. It supports
+        both a fixed number of pages or automatic pagination by setting total_pages="all".
+
+        Args:
+            uri_path: The relative URI path to request (e.g., "products").
+            per_page: Number of items per request (min 1, max 250).
+            total_pages: Number of pages to retrieve, or "all" to fetch until 'next' is empty.
+            fields: Optional list of item fields to request, sent as a comma separated
+                `fields` query parameter so the API only returns what is needed.
+            **params: Additional query parameters to pass to the request.
+
+        Returns:
+            CCVShopResult: Combined result with all paginated items in result.data["items"].
+        """
+        results = []
+        pages = 0
+        status_code = -1
+
+        for result in self._iter_paged(uri_path, per_page, total_pages, fields=fields, **params):
+            status_code = result.status_code
+            results.extend(cast(Dict[str, Any], result.data)["items"])
+            pages += 1
+
         return CCVShopResult(status_code=status_code, data={
             "items": results,
             "total_pages": pages,
@@ -1,6 +1,7 @@
 import logging
 from ftplib import FTP, error_perm, all_errors
 from io import BytesIO
+from pathlib import Path
 
 from ..errors import FtpError
 
@@ -70,3 +71,28 @@ class FTPClient:
         except all_errors as e:
             logger.error(f"Failed to download file {remote_path}: {e}")
             raise FtpError(f"Error downloading file {remote_path}: {e}") from e
+
+    def download_to_file(self, remote_path: str, local_path: str) -> Path:
+        """
+        Download a file straight to disk, without keeping its contents in memory.
+
+        Returns:
+            Path: The local path of the downloaded file.
+        """
+        if not self.ftp:
+            logger.error("FTP connection not established. Cannot download file.")
+            raise FtpError("FTP connection not established.")
+
+        path = Path(local_path)
+        try:
+            logger.debug(f"Downloading file: {remote_path} to {path}")
+            with open(path, "wb") as f:
+                self.ftp.retrbinary(f"RETR {remote_path}", f.write)
+            logger.info(f"Successfully downloaded file: {remote_path} ({path.stat().st_size} bytes)")
+            return path
+        except error_perm as e:
+            logger.error(f"Permission error when downloading {remote_path}: {e}")
+            raise FtpError(f"Permission denied for file: {remote_path}") from e
+        except all_errors as e:
+            logger.error(f"Failed to download file {remote_path}: {e}")
+            raise FtpError(f"Error downloading file {remote_path}: {e}") from e
@@ -1,10 +1,56 @@
-from time import sleep
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 
 import requests
-from jinja2 import Template
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ChunkedEncodingError, ConnectionError, HTTPError, Timeout
+from urllib3.exceptions import ProtocolError
 
+from ...cache import FileCache
+from ..rate_limit import RateLimiter
 from .models import PerfionResult
-from .parsing import perfion_resp_to_dict
+from .parsing import PerfionResponseParser
+from .query import ALL_FEATURES, ProductFilter, products_query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4  # Pages requested at the same time
+DEFAULT_PAGE_DELAY = 0.5  # Seconds between the start of two page requests
+RESPONSE_CHUNK_SIZE = 64 * 1024  # Bytes of a response parsed at a time
+DEFAULT_CONNECT_TIMEOUT = 10  # Seconds to wait for a connection
+DEFAULT_READ_TIMEOUT = 60  # Seconds to wait for the next bytes of a response
+DEFAULT_MAX_ATTEMPTS = 3  # Attempts of a page before giving up
+DEFAULT_RETRY_BACKOFF = 5  # Seconds before the first retry, doubled for every next one
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def pack_products(products: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Store products as one list of features and a row of values per product.
+
+    Missing and empty features are both stored as None, they read the same with `dict.get`.
+    """
+    columns: Dict[str, int] = {}
+    for product in products:
+        for key in product:
+            columns.setdefault(key, len(columns))
+
+    return {
+        "columns": list(columns),
+        "rows": [[product.get(key) for key in columns] for product in products],
+    }
+
+
+def unpack_products(packed: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Restore the products stored by `pack_products`."""
+    columns = packed["columns"]
+    return [
+        {key: value for key, value in zip(columns, row) if value is not None}
+        for row in packed["rows"]
+    ]
 
 
 class PerfionClient:
@@ -12,10 +58,53 @@ class PerfionClient:
         self,
         api_url: str = "https://perfion.tricorp.com:85/Perfion/GetData.asmx",
         *args,
+        workers: int = DEFAULT_WORKERS,
+        page_delay: float = DEFAULT_PAGE_DELAY,
+        features: Sequence[str] = ALL_FEATURES,
+        filters: ProductFilter = ProductFilter(),
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        cache: Optional[FileCache] = None,
         **kwargs,
     ):
         self.api_url = api_url
-        self.headers = {"Content-Type": "text/xml; charset=utf-8"}
+        self.headers = {
+            "Content-Type": "text/xml; charset=utf-8",
+            "Accept-Encoding": "gzip, deflate",
+        }
+
+        # Only these features are selected, the rest of a product is not transferred
+        self.features = list(features) or list(ALL_FEATURES)
+
+        # Added to the query of every request, e.g. the included categories
+        self.filters = filters
+
+        # Pages after the first are fetched by a bounded pool, spaced out by the delay
+        self.workers = max(1, workers)
+        self.rate_limiter = RateLimiter(page_delay)
+
+        # One connection per worker is kept open, so pages reuse the TLS connection
+        self.session = requests.Session()
+        self.session.mount(
+            "https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        )
+        self.session.mount(
+            "http://", HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        )
+        self.timeout = (connect_timeout, read_timeout)
+
+        # A failed page is fetched again after an exponential backoff
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+
+        # Optional, parsed pages keyed by their query, for repeated runs during development
+        self.cache = cache
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
 
     def _build_soap_envelope(self, query: str) -> str:
         return f"""<?xml version="1.0" encoding="utf-8"?>
@@ -30,60 +119,164 @@ class PerfionClient:
                     </soap12:Envelope>
         """
 
-    def _send_query(self, query: str) -> requests.Response:
+    def _send_query(self, query: str, stream: bool = False) -> requests.Response:
         body = self._build_soap_envelope(query)
-        response = requests.post(
-            self.api_url, data=body, headers=self.headers, timeout=30
+        response = self.session.post(
+            self.api_url,
+            data=body.encode("utf-8"),
+            headers=self.headers,
+            timeout=self.timeout,
+            stream=stream,
         )
-        response.raise_for_status()
+        try:
+            response.raise_for_status()
+        except HTTPError:
+            # A streamed response holds its pooled connection until it is closed
+            response.close()
+            raise
         return response
 
     @staticmethod
-    def __get_products_query(index, per_page, item_number=None):
-        template = Template("""
-        <Query>
-        <Select languages="NLD" index="{{ index }}" maxCount="{{ per_page }}" options="IncludeTotalCount,IncludeFeatureViewOrder">
-            <Feature id="**" view="Detail"/>
-        </Select>
-        <From id="100"/>
-        <Where>
-            <Clause id="Category" operator="HAS"/>
-            <Clause id="stage" operator="=" value="Approved"/>
-            <Clause id="ReleaseToERP" operator="=" value="Yes"/>
-            <Clause id="ItemStatus" operator="=" value="Voorraad artikel"/>
-            <Clause id="ERPCompany" operator="=" value="37904"/>
-        </Where>
-        <Order><By id="String" direction="asc"/></Order>
-        </Query>
-        """)
-        return template.render(index=index, per_page=per_page)
-
-    # TODO: Item number should do something in the query later on
-    def get_products(self, per_page=1000, total_pages=1, item_number=None):
+    def _should_retry(error: Exception) -> bool:
+        if isinstance(error, HTTPError):
+            return error.response is not None and error.response.status_code in RETRY_STATUS_CODES
+        return True
+
+    def _get_page(self, index: int, per_page: int, filters: ProductFilter) -> Dict[str, Any]:
+        """
+        Fetch a single page of the products matching `filters`, starting at `index`.
+
+        Connection errors, timeouts and rate limit or server errors are retried with an
+        exponential backoff, the page is then parsed again from the start. When a cache is
+        set a page with the same query is read from it instead.
+        """
+        query = products_query(index, per_page, features=self.features, filters=filters)
+        cache_key = f"{self.api_url}\n{query}"
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Using cached Perfion page at index {index}")
+                return {**cached, "products": unpack_products(cached["products"])}
+
+        attempt = 1
+        while True:
+            try:
+                page = self._fetch_page(index, query)
+                break
+            except (ConnectionError, ChunkedEncodingError, ProtocolError, Timeout, HTTPError) as err:
+                if attempt >= self.max_attempts or not self._should_retry(err):
+                    logger.error(
+                        f"Fetching Perfion page at index {index} failed after {attempt} attempts: {err}"
+                    )
+                    raise
+
+                wait_time = self.retry_backoff * (2 ** (attempt - 1))
+                logger.warning(
+                    f"Error on attempt {attempt}/{self.max_attempts} of Perfion page at index "
+                    f"{index}: {type(err).__name__}. Retrying in {wait_time} seconds..."
+                )
+                time.sleep(wait_time)
+                attempt += 1
+
+        if self.cache:
+            self.cache.set(cache_key, {**page, "products": pack_products(page["products"])})
+
+        return page
+
+    def _fetch_page(self, index: int, query: str) -> Dict[str, Any]:
+        """The response is parsed while it is downloaded, only the product dicts are kept."""
+        self.rate_limiter.wait()
+
+        start = time.perf_counter()
+        size = 0
+        parser = PerfionResponseParser()
+        products = []
+        with self._send_query(query, stream=True) as response:
+            for chunk in response.iter_content(chunk_size=RESPONSE_CHUNK_SIZE):
+                size += len(chunk)
+                products.extend(parser.feed(chunk))
+            products.extend(parser.close())
+
+        logger.debug(
+            f"Fetched Perfion page at index {index}: {len(products)} products, "
+            f"{size} bytes in {time.perf_counter() - start:.2f}s"
+        )
+        return {
+            "status_code": response.status_code,
+            "totalCount": parser.total_count,
+            "products": products,
+        }
+
+    def _iter_pages(
+        self, per_page: int, total_pages: int, filters: ProductFilter
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield pages in order.
+
+        The first page tells the total count, the remaining pages are then fetched
+        concurrently by at most `workers` requests.
+        """
         if total_pages < -1 or total_pages == 0:
             raise (ValueError("Total page cannot be below -1 or 0"))
 
-        start = 0
-        results = []
-        pages = 0
-        status_code = -1
+        start = time.perf_counter()
+        first = self._get_page(0, per_page, filters)
+        total_count = first["totalCount"]
+        yield first
 
-        while pages < total_pages or total_pages == -1:
-            paging_params = {"index": start, "per_page": per_page}
+        indexes = list(range(per_page, total_count, per_page))
+        if total_pages != -1:
+            indexes = indexes[: total_pages - 1]
 
-            result = self._send_query(self.__get_products_query(**paging_params))
-            sleep(4)
-            status_code = result.status_code
-            text = result.content.decode("utf-8")
-            print(text)
-            data = perfion_resp_to_dict(text)  # type: ignore
+        if indexes:
+            with ThreadPoolExecutor(
+                max_workers=min(self.workers, len(indexes)), thread_name_prefix="perfion"
+            ) as pool:
+                yield from pool.map(lambda index: self._get_page(index, per_page, filters), indexes)
 
-            results.extend(data.get("products", []))
-            start += per_page
+        logger.debug(
+            f"Fetched {total_count} Perfion products in {len(indexes) + 1} pages "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
 
-            if len(results) == data.get("totalCount"):
-                break
+    def iter_products(
+        self,
+        per_page=1000,
+        total_pages=-1,
+        item_numbers: Sequence[str] = (),
+        modified_since: Optional[datetime] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield products in the Perfion order.
+
+        Args:
+            per_page: Products per page.
+            total_pages: Number of pages to fetch, -1 for all of them.
+            item_numbers: Only fetch the rows of these ItemNumbers.
+            modified_since: Only fetch rows modified at or after this (Perfion server) time.
+        """
+        filters = self.filters._replace(item_numbers=item_numbers, modified_since=modified_since)
+        for page in self._iter_pages(per_page, total_pages, filters):
+            yield from page["products"]
+
+    def get_products(self, per_page=1000, total_pages=1, item_number=None):
+        """
+        Fetch products page by page, see `iter_products`.
+
+        Args:
+            per_page: Products per page.
+            total_pages: Number of pages to fetch, -1 for all of them.
+            item_number: Only fetch the rows of this ItemNumber.
+
+        Returns:
+            PerfionResult: The status code of the first page and all products.
+        """
+        status_code = -1
+        results = []
+        filters = self.filters._replace(item_numbers=[item_number] if item_number else ())
+        for page in self._iter_pages(per_page, total_pages, filters):
+            if status_code == -1:
+                status_code = page["status_code"]
+            results.extend(page["products"])
 
-        print("HAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAH")
-        print(len(results))
         return PerfionResult(status_code=status_code, data=results)
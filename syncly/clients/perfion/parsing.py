@@ -1,31 +1,112 @@
-from typing import Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 import xml.etree.ElementTree as ET
+import xml.sax
+from xml.sax.handler import ContentHandler, feature_namespaces
 
-def perfion_resp_to_dict(soap_response: str) -> Dict[str, Any]:
+SOAP_RESULT = ("http://perfion.com/", "ExecuteQueryResult")
+
+
+class _QueryResultHandler(ContentHandler):
+    """Forwards the text of the ExecuteQueryResult element of the SOAP envelope."""
+
+    def __init__(self, inner: ET.XMLPullParser):
+        super().__init__()
+        self.inner = inner
+        self.inside = False
+        self.found = False
+
+    def startElementNS(self, name, qname, attrs):
+        if name == SOAP_RESULT:
+            self.inside = self.found = True
+
+    def endElementNS(self, name, qname):
+        if name == SOAP_RESULT:
+            self.inside = False
+
+    def characters(self, content):
+        if self.inside:
+            self.inner.feed(content)
+
+
+class PerfionResponseParser:
     """
-    Returns a dictionary version of the perfion responds
+    Incremental parser of a Perfion ExecuteQuery SOAP response.
+
+    The SOAP envelope is read with SAX, the escaped query result inside it is fed to a pull
+    parser as it arrives. Products are returned as soon as their element is complete and
+    are then dropped from the tree, so neither the response text nor a full tree is kept.
     """
-    root = ET.fromstring(soap_response)
-    ns = {'soap': 'http://www.w3.org/2003/05/soap-envelope'}
-    result_elem = root.find('.//soap:Body//{http://perfion.com/}ExecuteQueryResult', ns)
 
-    if result_elem is None or not result_elem.text:
-        raise ValueError("No ExecuteQueryResult content found")
+    def __init__(self) -> None:
+        self.total_count: Optional[int] = None
+        self._inner = ET.XMLPullParser(events=("start", "end"))
+        self._handler = _QueryResultHandler(self._inner)
+        self._outer = xml.sax.make_parser()
+        self._outer.setFeature(feature_namespaces, True)
+        self._outer.setContentHandler(self._handler)
+        self._root: Optional[ET.Element] = None
+        self._depth = 0
 
-    inner_root = ET.fromstring(result_elem.text)
+    def _products(self) -> Iterator[Dict[str, Any]]:
+        for event, elem in self._inner.read_events():
+            if event == "start":
+                self._depth += 1
+                if self._depth == 1:
+                    self._root = elem
+                    total_count = elem.get("totalCount")
+                    if not total_count:
+                        raise ValueError("Total Count is expected to exist as attribute in data")
+                    self.total_count = int(total_count)
+                continue
 
-    total_count = inner_root.get("totalCount")
-    if not total_count:
-        raise ValueError("Total Count is expected to exist as attribute in data")
+            self._depth -= 1
+            if self._depth == 1 and elem.tag == "Product":
+                yield {
+                    "id": elem.attrib.get("id"),
+                    **{child.tag: child.text for child in elem},
+                }
+                elem.clear()
+                if self._root is not None:
+                    self._root.remove(elem)
 
-    products = []
-    for product in inner_root.findall('./Product'):
-        products.append({
-            'id': product.attrib.get('id'),
-            **{child.tag: child.text for child in product}
-        })
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """Parse the next chunk of the response and return the products it completed."""
+        self._outer.feed(chunk)
+        return list(self._products())
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Finish parsing and return the remaining products.
+
+        Raises:
+            ValueError: When the response holds no query result.
+        """
+        self._outer.close()
+        if not self._handler.found or self.total_count is None:
+            raise ValueError("No ExecuteQueryResult content found")
+
+        products = list(self._products())
+        self._inner.close()
+        return products
+
+
+def iter_perfion_products(chunks: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+    """Lazily yield the products of a Perfion response read in chunks."""
+    parser = PerfionResponseParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def perfion_resp_to_dict(soap_response: str) -> Dict[str, Any]:
+    """
+    Returns a dictionary version of the perfion responds
+    """
+    parser = PerfionResponseParser()
+    products = parser.feed(soap_response.encode("utf-8"))
+    products.extend(parser.close())
 
     return {
-        "totalCount": int(total_count),
+        "totalCount": parser.total_count,
         "products": products
     }
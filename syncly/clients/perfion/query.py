@@ -0,0 +1,106 @@
+"""
+Perfion query builder.
+
+The query templates are compiled once at import, rendering a page only fills in the
+paging, the selected features and the clauses. Filters are added to the `<Where>` of the
+query, so Perfion only returns the matching products.
+"""
+
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from jinja2 import Environment
+
+ALL_FEATURES = ("**",)  # Every feature of the Detail view
+MODIFIED_SINCE_FORMAT = "%Y-%m-%d %H:%M:%S"
+VALUE_SEPARATOR = "|"  # Separates the values of an IN clause
+
+# (feature, operator, value) clauses every products query has
+PRODUCT_CLAUSES: List[Tuple[str, str, Optional[str]]] = [
+    ("Category", "HAS", None),
+    ("stage", "=", "Approved"),
+    ("ReleaseToERP", "=", "Yes"),
+    ("ItemStatus", "=", "Voorraad artikel"),
+    ("ERPCompany", "=", "37904"),
+]
+
+_environment = Environment(autoescape=True)
+
+PRODUCTS_QUERY = """
+        <Query>
+        <Select languages="NLD" index="{{ index }}" maxCount="{{ per_page }}" options="IncludeTotalCount,IncludeFeatureViewOrder">
+        {%- for feature in features %}
+            <Feature id="{{ feature }}" view="Detail"/>
+        {%- endfor %}
+        </Select>
+        <From id="100"/>
+        <Where>
+        {%- for id, operator, value in clauses %}
+            <Clause id="{{ id }}" operator="{{ operator }}"{% if value is not none %} value="{{ value }}"{% endif %}/>
+        {%- endfor %}
+        </Where>
+        <Order><By id="String" direction="asc"/></Order>
+        </Query>
+        """
+PRODUCTS_TEMPLATE = _environment.from_string(PRODUCTS_QUERY)
+
+
+class ProductFilter(NamedTuple):
+    """Products to request, empty filters match every product."""
+
+    item_numbers: Sequence[str] = ()
+    categories: Sequence[str] = ()
+    excluded_item_numbers: Sequence[str] = ()
+    modified_since: Optional[datetime] = None  # Naive, in the Perfion server timezone
+
+
+def _values_clause(
+    feature: str, values: Sequence[str], exclude: bool = False
+) -> Tuple[str, str, str]:
+    if len(values) == 1:
+        return (feature, "<>" if exclude else "=", values[0])
+
+    return (feature, "NOT IN" if exclude else "IN", VALUE_SEPARATOR.join(values))
+
+
+def product_clauses(filters: ProductFilter) -> List[Tuple[str, str, Optional[str]]]:
+    """Return the `<Where>` clauses of a products query with these filters."""
+    clauses = list(PRODUCT_CLAUSES)
+    if filters.item_numbers:
+        clauses.append(_values_clause("ItemNumber", filters.item_numbers))
+    if filters.categories:
+        clauses.append(_values_clause("Category", filters.categories))
+    if filters.excluded_item_numbers:
+        clauses.append(_values_clause("ItemNumber", filters.excluded_item_numbers, exclude=True))
+    if filters.modified_since:
+        clauses.append(
+            ("modifiedDate", ">=", filters.modified_since.strftime(MODIFIED_SINCE_FORMAT))
+        )
+
+    return clauses
+
+
+def products_query(
+    index: int,
+    per_page: int,
+    features: Sequence[str] = ALL_FEATURES,
+    filters: ProductFilter = ProductFilter(),
+) -> str:
+    """
+    Render the query of a page of products.
+
+    Args:
+        index: Index of the first product of the page.
+        per_page: Products per page.
+        features: Features to select, `ALL_FEATURES` for every feature.
+        filters: Products to request.
+
+    Returns:
+        str: The query, to be sent in an ExecuteQuery SOAP envelope.
+    """
+    return PRODUCTS_TEMPLATE.render(
+        index=index,
+        per_page=per_page,
+        features=features or ALL_FEATURES,
+        clauses=product_clauses(filters),
+    )
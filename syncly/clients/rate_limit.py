@@ -0,0 +1,26 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Spaces calls at least `interval` seconds apart.
+
+    A single limiter can be shared between clients and threads, every caller of `wait`
+    reserves the next free slot, so the combined request rate never exceeds 1/interval.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> None:
+        """Block until the caller may make its next call."""
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+
+        if delay > 0:
+            time.sleep(delay)
@@ -1,111 +1,166 @@
 import logging
+import multiprocessing
+import re
+import threading
+import time
 
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple, Type
 from collections import defaultdict
-from diffsync.diff import Diff
+from diffsync import Adapter
+from diffsync.diff import Diff, DiffElement
+from diffsync import DiffSyncModel
+from diffsync.enum import DiffSyncActions, DiffSyncFlags, DiffSyncModelFlags
+from diffsync.helpers import DiffSyncDiffer
+from diffsync.utils import intersection, symmetric_difference
 
-from .settings import get_settings
+from .settings import Settings, get_settings
 from .helpers import normalize_string
+from .digest import get_digest
 
 logger = logging.getLogger(__name__)
 
 
+# Fallback ordering of lettered sizes, used when `ccv_shop.size_order` is not configured
+DEFAULT_SIZE_ORDER: Tuple[str, ...] = (
+    "2XS",
+    "XS",
+    "XS/S",
+    "S",
+    "S-M",
+    "M",
+    "M/L",
+    "L",
+    "L-XL",
+    "XL",
+    "XXL",
+    "X/2XL",
+    "2XL",
+    "2XL-3XL",
+    "3XL",
+    "3/4XL",
+    "3XL-4XL",
+    "4XL",
+    "4XL-5XL",
+    "5XL",
+    "6XL",
+    "7XL",
+    "8XL",
+    "ONE",
+    "ONESIZE",
+)
+
+_NUMERIC_SIZE = re.compile(r"^\d+$")
+# Size Example 36-38 or 36/38, split on the first separator like the supplier feeds do
+_NUMERIC_RANGE_SIZE = re.compile(r"^\d+([-/])\d+(?:\1\d+)*$")
+_WAIST_SIZE = re.compile(r"^W(\d+)$")
+_CIRCUMFERENCE_SIZE = re.compile(r"^C(\d+)$")
+# Size Example 90C87 (length C circumference)
+_LENGTH_CIRCUMFERENCE_SIZE = re.compile(r"^(\d+)C(\d+)$")
+
+
+@lru_cache(maxsize=None)
+def _size_ranks(size_order: Tuple[str, ...]) -> Dict[str, int]:
+    return {size.strip().upper(): rank for rank, size in enumerate(size_order)}
+
+
+@lru_cache(maxsize=4096)
+def size_sort_key(size: str, size_order: Tuple[str, ...] = DEFAULT_SIZE_ORDER) -> tuple:
+    """
+    Sort key for a size string.
+
+    Numeric sizes come first, then waist (W32), circumference (C46), lettered sizes
+    in the order of `size_order`, length/circumference (90C87) and finally anything unknown.
+    """
+    size = size.strip().upper()
+
+    if _NUMERIC_SIZE.match(size):
+        return (0, int(size))
+
+    if match := _NUMERIC_RANGE_SIZE.match(size):
+        nums = [int(part) for part in size.split(match.group(1))]
+        return (0, nums[0], nums[1])
+
+    if match := _WAIST_SIZE.match(size):
+        return (1, int(match.group(1)))
+
+    if match := _CIRCUMFERENCE_SIZE.match(size):
+        return (2, int(match.group(1)))
+
+    if match := _LENGTH_CIRCUMFERENCE_SIZE.match(size):
+        return (4, int(match.group(1)), int(match.group(2)))
+
+    rank = _size_ranks(size_order).get(size)
+    if rank is not None:
+        return (3, rank)
+
+    return (9, 999, size)
+
+
+class AttributeOrdering(NamedTuple):
+    """Settings derived lookups used to order the attribute values of every product."""
+
+    color_category: str
+    sizing_category: str
+    color_index: Dict[str, int]
+    size_order: Tuple[str, ...]
+
+
+_attribute_ordering: Optional[Tuple[Settings, AttributeOrdering]] = None
+
+
+def attribute_ordering(settings: Settings) -> AttributeOrdering:
+    """
+    Get the attribute ordering for `settings`.
+
+    Every diff element creates its own Diff instance, so the ordering is kept at module
+    level and only rebuilt when a different settings object is loaded.
+    """
+    global _attribute_ordering
+    if _attribute_ordering is None or _attribute_ordering[0] is not settings:
+        colors = [normalize_string(x) for x in settings.mapping.color.values() if x]
+        ordering = AttributeOrdering(
+            color_category=settings.ccv_shop.color_category,
+            sizing_category=settings.ccv_shop.sizing_category,
+            color_index={value: idx for idx, value in enumerate(colors)},
+            size_order=tuple(settings.ccv_shop.size_order) or DEFAULT_SIZE_ORDER,
+        )
+        _attribute_ordering = (settings, ordering)
+
+    return _attribute_ordering[1]
+
+
 class AttributeOrderingDiff(Diff):
     @staticmethod
-    def _order_sizing_attributes(children: list) -> list:
+    def _order_sizing_attributes(
+        children: list, size_order: Tuple[str, ...] = DEFAULT_SIZE_ORDER
+    ) -> list:
         """Reorder `children` based on their 'value' key, which represents sizes."""
-
-        def parse_size(size: str):
-            size = size.strip().upper()
-
-            if size.isdigit():
-                return (0, int(size))
-
-            if "-" in size or "/" in size:
-                sep = "-" if "-" in size else "/"
-                parts = size.split(sep)
-                try:
-                    nums = [int(p) for p in parts]
-                    return (0, nums[0], nums[1] if len(nums) > 1 else 0)
-                except ValueError:
-                    pass
-
-            if size.startswith("W") and size[1:].isdigit():
-                return (1, int(size[1:]))
-
-            if size.startswith("C") and size[1:].isdigit():
-                return (2, int(size[1:]))
-
-            # Size Example 90C87 (length C circumference)
-            if "C" in size:
-                split_sizes = size.split("C")
-                try:
-                    length = int(split_sizes[0])
-                    circumference = int(split_sizes[1])
-                    return (4, length, circumference)
-                except (ValueError, IndexError):
-                    pass
-
-            alpha_order = {
-                "2XS": 90,
-                "XS": 100,
-                "XS/S": 101,
-                "S": 102,
-                "S-M": 103,
-                "M": 104,
-                "M/L": 105,
-                "L": 106,
-                "L-XL": 107,
-                "XL": 108,
-                "XXL": 109,
-                "X/2XL": 110,
-                "2XL": 111,
-                "2XL-3XL": 112,
-                "3XL": 113,
-                "3/4XL": 114,
-                "3XL-4XL": 115,
-                "4XL": 116,
-                "4XL-5XL": 117,
-                "5XL": 118,
-                "6XL": 119,
-                "7XL": 120,
-                "8XL": 121,
-                "ONE": 200,
-                "ONESIZE": 200,
-            }
-            if size in alpha_order:
-                return (3, alpha_order[size])
-
-            return (9, 999, size)
-
-        return sorted(children, key=lambda child: parse_size(child.keys.get("value")))
+        return sorted(
+            children,
+            key=lambda child: size_sort_key(child.keys.get("value"), size_order),
+        )
 
     @staticmethod
-    def _order_attributes(reference_order: list, children: list) -> list:
+    def _order_attributes(index_of: Dict[str, int], children: list) -> list:
         """
         Reorder `children` so their .keys['value'] appear in the same
-        sequence as `reference_order`. Extra children are appended.
+        sequence as in `index_of`. Extra children are appended.
 
         Args:
-            reference_order (list): Sequence of values defining the new order.
+            index_of (dict): Position of every known value in the new order.
             children (list): List of DiffSync child instances to reorder.
 
         Returns:
-            list: Children reordered to match reference_order.
+            list: Children reordered to match index_of.
         """
-        index_of = {value: idx for idx, value in enumerate(reference_order)}
-        result = [None] * len(reference_order)
 
-        for child in children:
-            val = child.keys.get("value")
-            pos = index_of.get(val)
-            if pos is None:
-                #                logger.warning("Unknown value %r, appending to end", val)
-                result.append(child)
-            else:
-                result[pos] = child
+        def position(child) -> Tuple[bool, int]:
+            pos = index_of.get(child.keys.get("value"))
+            return (pos is None, pos or 0)
 
-        return [item for item in result if item]
+        # sorted is stable, so unknown values keep their order at the end
+        return sorted(children, key=position)
 
     @classmethod
     def order_children_attribute_value_to_product(cls, children: Dict[Any, Any]):
@@ -114,8 +169,7 @@ class AttributeOrderingDiff(Diff):
         'lettermaatvoering' group according to our sizing mapping.
         """
 
-        settings = get_settings()
-        color_mapping = settings.mapping.color
+        ordering = attribute_ordering(get_settings())
 
         attribute_groups: Dict[str, list] = defaultdict(list)
         for child in children.values():
@@ -123,18 +177,212 @@ class AttributeOrderingDiff(Diff):
             attribute_groups[attr_name].append(child)
 
         # Order the 'kleuren' group
-        letter_group = attribute_groups.get(settings.ccv_shop.color_category, [])
-        reference = [normalize_string(x) for x in color_mapping.values()]  # type: ignore
-        attribute_groups[settings.ccv_shop.color_category] = cls._order_attributes(
-            reference, letter_group
+        letter_group = attribute_groups.get(ordering.color_category, [])
+        attribute_groups[ordering.color_category] = cls._order_attributes(
+            ordering.color_index, letter_group
         )
 
         # Order the 'maten' group
-        sizing = attribute_groups.get(settings.ccv_shop.sizing_category, [])
-        attribute_groups[settings.ccv_shop.sizing_category] = (
-            cls._order_sizing_attributes(sizing)
+        sizing = attribute_groups.get(ordering.sizing_category, [])
+        attribute_groups[ordering.sizing_category] = (
+            cls._order_sizing_attributes(sizing, ordering.size_order)
         )
 
         for childs in attribute_groups.values():
             for child in childs:
                 yield child
+
+
+class DigestDiffer(DiffSyncDiffer):
+    """
+    DiffSyncDiffer which skips identical subtrees using the adapters' content digests.
+
+    When a source and destination object have the same digest, an element without
+    changes is returned right away and their children are never compared. Adapters
+    without digests are diffed as usual.
+    """
+
+    def diff_object_pair(
+        self, src_obj: Optional[DiffSyncModel], dst_obj: Optional[DiffSyncModel]
+    ) -> Optional[DiffElement]:
+        if not src_obj or not dst_obj:
+            return super().diff_object_pair(src_obj, dst_obj)
+
+        if (src_obj.model_flags | dst_obj.model_flags) & DiffSyncModelFlags.IGNORE:
+            return super().diff_object_pair(src_obj, dst_obj)
+
+        digest = get_digest(self.src_diffsync, src_obj)
+        if not digest or digest != get_digest(self.dst_diffsync, dst_obj):
+            return super().diff_object_pair(src_obj, dst_obj)
+
+        diff_element = DiffElement(
+            obj_type=src_obj.get_type(),
+            name=src_obj.get_shortname(),
+            keys=src_obj.get_identifiers(),
+            source_name=self.src_diffsync.name,
+            dest_name=self.dst_diffsync.name,
+            diff_class=self.diff_class,
+        )
+        attrs = src_obj.get_attrs()
+        diff_element.add_attrs(source=attrs, dest=attrs)
+        self.incr_models_processed(2)
+        return diff_element
+
+
+THREADS_DONE_TIMEOUT = 1.0  # Seconds to wait for other threads to finish before forking
+
+# Adapters and diff options shared with forked diff workers, see `parallel_diff`
+_worker_state: Optional[Tuple[Adapter, Adapter, DiffSyncFlags, Type[Diff]]] = None
+
+
+def _diff_partition(
+    partition: Tuple[str, List[str]],
+) -> Tuple[List[DiffElement], int]:
+    """Diff a single partition of top-level objects inside a worker process."""
+    assert _worker_state, "Diff workers should be forked from parallel_diff"
+    src, dst, flags, diff_class = _worker_state
+    obj_type, uids = partition
+
+    src_objs = {uid: obj for uid in uids if (obj := src.get_or_none(obj_type, uid))}
+    dst_objs = {uid: obj for uid in uids if (obj := dst.get_or_none(obj_type, uid))}
+
+    differ = DigestDiffer(src, dst, flags, diff_class=diff_class)
+    elements = differ.diff_object_list(src=src_objs, dst=dst_objs)  # type: ignore
+    return elements, differ.models_processed
+
+
+def _other_threads_done(timeout: float = THREADS_DONE_TIMEOUT) -> bool:
+    """Wait for threads that are finishing, e.g. a stopped progress display, before a fork."""
+    deadline = time.monotonic() + timeout
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(max(0.0, deadline - time.monotonic()))
+    return threading.active_count() == 1
+
+
+def parallel_diff(
+    src: Adapter,
+    dst: Adapter,
+    diff_class: Type[Diff] = AttributeOrderingDiff,
+    flags: DiffSyncFlags = DiffSyncFlags.NONE,
+    workers: int = 4,
+    partitions_per_worker: int = 4,
+) -> Diff:
+    """
+    Calculate the diff from `src` to `dst` with the top-level objects split across processes.
+
+    Every top-level object (a product with its categories, attribute values and photos) is
+    diffed on its own, so the work is split into contiguous partitions of object ids which
+    are diffed in forked worker processes and added to one Diff in the original order.
+    Identical subtrees are skipped using content digests, see `DigestDiffer`.
+
+    Fork is used on purpose: the workers read the loaded adapters from the copied memory,
+    while the adapters hold clients, sessions and progress callbacks that can not be
+    pickled for a forkserver or spawn worker, and pickling every product tree would cost
+    more than the diff itself. A fork only copies the calling thread, so it is safe once
+    the loading threads are done and no other thread can hold a lock the workers need.
+    The diff is calculated in process by `DigestDiffer` when fork is not available, other
+    threads keep running or a single worker is asked.
+
+    Args:
+        src: Source adapter, as in `src.diff_to(dst)`.
+        dst: Destination adapter.
+        diff_class: Diff or subclass thereof to use for diff calculation and storage.
+        flags: Flags influencing the behavior of this diff operation.
+        workers: Number of worker processes.
+        partitions_per_worker: Partitions per worker, more partitions balance uneven products better.
+
+    Returns:
+        Diff: The merged diff, with the same changes `src.diff_to(dst)` would calculate.
+    """
+    global _worker_state
+
+    if workers > 1 and not _other_threads_done():
+        logger.warning("Other threads are running, calculating the diff in process")
+        workers = 1
+
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return DigestDiffer(src, dst, flags, diff_class=diff_class).calculate_diffs()
+
+    partitions: List[Tuple[str, List[str]]] = []
+    models_processed = 0
+    for obj_type in symmetric_difference(dst.top_level, src.top_level):
+        adapter = dst if obj_type in dst.top_level else src
+        models_processed += len(adapter.get_all(obj_type))
+
+    for obj_type in intersection(dst.top_level, src.top_level):
+        uids = [obj.get_unique_id() for obj in src.get_all(obj_type)]
+        known = set(uids)
+        uids.extend(
+            uid for obj in dst.get_all(obj_type) if (uid := obj.get_unique_id()) not in known
+        )
+
+        size = max(1, -(-len(uids) // (workers * partitions_per_worker)))
+        partitions.extend(
+            (obj_type, uids[start:start + size]) for start in range(0, len(uids), size)
+        )
+
+    logger.info(f"Calculating diff in {len(partitions)} partitions over {workers} workers")
+
+    diff = diff_class()
+    _worker_state = (src, dst, flags, diff_class)
+    try:
+        context = multiprocessing.get_context("fork")
+        with context.Pool(processes=workers) as pool:
+            for elements, processed in pool.imap(_diff_partition, partitions):
+                for element in elements:
+                    diff.add(element)
+                models_processed += processed
+    finally:
+        _worker_state = None
+
+    diff.models_processed = models_processed
+    diff.complete()
+    return diff
+
+
+def skip_unmatched_top_level(src: Adapter, dst: Adapter) -> int:
+    """
+    Keep the destination objects a partial source did not load from being deleted.
+
+    Only the unmatched top-level objects (products) are flagged, unlike the global
+    `DiffSyncFlags.SKIP_UNMATCHED_DST`. The children of products the source did load
+    still diff normally, so their removed sizes, colors or photos are deleted.
+
+    Returns:
+        int: Number of flagged objects.
+    """
+    skipped = 0
+    for model_type in dst.top_level:
+        for obj in dst.get_all(model_type):
+            if src.get_or_none(model_type, obj.get_unique_id()) is None:
+                obj.model_flags |= DiffSyncModelFlags.SKIP_UNMATCHED_DST
+                skipped += 1
+    return skipped
+
+
+def count_unapplied(diff: Diff, dst: Adapter) -> int:
+    """
+    Count the changes of a synced diff that are not reflected in the destination.
+
+    A sync with `CONTINUE_ON_FAILURE` logs a failed create, update or delete and moves
+    on, the children of a failed element are not synced at all.
+    """
+    unapplied = 0
+    elements = list(diff.get_children())
+    while elements:
+        element = elements.pop()
+        elements.extend(element.get_children())
+        if not element.action:
+            continue
+
+        model = dst.get_or_none(element.type, element.keys)
+        if element.action == DiffSyncActions.DELETE:
+            applied = model is None
+        else:
+            applied = model is not None and all(
+                getattr(model, key) == value
+                for key, value in element.get_attrs_diffs().get("+", {}).items()
+            )
+        unapplied += not applied
+    return unapplied
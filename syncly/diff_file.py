@@ -0,0 +1,234 @@
+"""
+Machine readable diff files.
+
+A diff is written as JSON lines while walking it, so it is never materialized as a whole.
+The first line is a header, every following line is either a `change` record for one
+changed object or a `blob` record. Large binary attributes (the base64 `source` of photos)
+are not inlined in the change records, they are referenced by their sha1 and every distinct
+blob is written once, before the first change that references it.
+
+Objects without changes of their own but with changed children are written with an action
+of null, so the tree can be rebuilt. When the destination adapter is given, the `id` of
+every existing destination object is stored too, which lets `read_diff` replay the file
+without loading the destination again.
+
+Files ending in `.gz` are transparently gzip compressed.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Type
+
+from diffsync import Adapter
+from diffsync.diff import Diff, DiffElement
+
+logger = logging.getLogger(__name__)
+
+DIFF_FILE_VERSION = 1
+
+# (model type, attribute) pairs holding base64 payloads, stored as blob references
+BLOB_ATTRIBUTES = {
+    ("product_photo", "source"),
+}
+
+BLOB_REF = "$blob"
+
+
+def open_diff_file(path: str, mode: str = "r") -> IO[str]:
+    """Open a diff file for reading ("r") or writing ("w"), gzip compressed when it ends in .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, f"{mode}t", encoding="utf-8")  # type: ignore[return-value]
+    return open(path, mode, encoding="utf-8")
+
+
+def blob_hash(value: str) -> str:
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+
+def iter_diff_records(
+    diff: Diff,
+    destination: Optional[Adapter] = None,
+    parent: Optional[Dict[str, str]] = None,
+    seen_blobs: Optional[Set[str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield the records describing a diff, parents always come before their children.
+
+    Args:
+        diff (Diff): The diff to walk.
+        destination (Adapter): Adapter the diff applies to, used to look up object ids.
+        parent (dict): Type and name of the element owning this diff, None for the root.
+        seen_blobs (set): Hashes of the blobs that have already been yielded.
+
+    Yields:
+        dict: `blob` and `change` records.
+    """
+    if seen_blobs is None:
+        seen_blobs = set()
+
+    for element in diff.get_children():
+        if not element.has_diffs(include_children=True):
+            continue
+
+        record: Dict[str, Any] = {
+            "kind": "change",
+            "type": element.type,
+            "name": element.name,
+            "action": element.action,
+            "keys": element.keys,
+            "parent": parent,
+        }
+
+        if destination and element.dest_attrs is not None:
+            existing = destination.get_or_none(element.type, element.keys)
+            record["id"] = getattr(existing, "id", None)
+
+        for sign, attrs in element.get_attrs_diffs().items():
+            attrs = dict(attrs)
+            for attr, value in attrs.items():
+                if (element.type, attr) not in BLOB_ATTRIBUTES or not isinstance(value, str):
+                    continue
+
+                digest = blob_hash(value)
+                if digest not in seen_blobs:
+                    seen_blobs.add(digest)
+                    yield {"kind": "blob", "hash": digest, "data": value}
+                attrs[attr] = {BLOB_REF: digest}
+            record[sign] = attrs
+        yield record
+
+        if element.child_diff.has_diffs():
+            yield from iter_diff_records(
+                element.child_diff,
+                destination=destination,
+                parent={"type": element.type, "name": element.name},
+                seen_blobs=seen_blobs,
+            )
+
+
+def write_diff(
+    diff: Diff, path: str, destination: Optional[Adapter] = None, **meta: Any
+) -> int:
+    """
+    Write a diff to a JSONL file.
+
+    Args:
+        diff (Diff): The diff to write.
+        path (str): Destination file, compressed with gzip when it ends in .gz.
+        destination (Adapter): Adapter the diff applies to, its object ids are stored.
+        **meta: Extra information stored in the header, e.g. the source and destination.
+
+    Returns:
+        int: The number of changes written.
+    """
+    changes = 0
+    with open_diff_file(path, "w") as f:
+        header = {
+            "kind": "header",
+            "version": DIFF_FILE_VERSION,
+            "models_processed": diff.models_processed,
+            **meta,
+        }
+        f.write(json.dumps(header, default=str) + "\n")
+        for record in iter_diff_records(diff, destination=destination):
+            if record["kind"] == "change" and record["action"]:
+                changes += 1
+            f.write(json.dumps(record, default=str) + "\n")
+
+    logger.info(f"Wrote {changes} changes to {path}")
+    return changes
+
+
+class DiffFile(NamedTuple):
+    header: Dict[str, Any]
+    diff: Diff
+    # Change records of objects that already exist in the destination, blobs resolved
+    existing: List[Dict[str, Any]]
+
+
+def _resolve_blobs(attrs: Dict[str, Any], blobs: Dict[str, str]) -> Dict[str, Any]:
+    resolved = {}
+    for attr, value in attrs.items():
+        if isinstance(value, dict) and BLOB_REF in value:
+            value = blobs[value[BLOB_REF]]
+        resolved[attr] = value
+    return resolved
+
+
+def read_diff(path: str, diff_class: Type[Diff] = Diff) -> DiffFile:
+    """
+    Read a diff written by `write_diff` back into a Diff.
+
+    Args:
+        path (str): The diff file, gzip compressed when it ends in .gz.
+        diff_class (Type[Diff]): Diff class to build, children keep the order of the file.
+
+    Returns:
+        DiffFile: The header, the rebuilt diff and the records of existing destination objects.
+
+    Raises:
+        ValueError: When the file is not a diff file of a supported version.
+    """
+    header: Optional[Dict[str, Any]] = None
+    diff = diff_class()
+    elements: Dict[Tuple[str, str], DiffElement] = {}
+    existing: List[Dict[str, Any]] = []
+    blobs: Dict[str, str] = {}
+
+    with open_diff_file(path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+
+            record = json.loads(line)
+            kind = record.get("kind")
+
+            if header is None:
+                if kind != "header" or record.get("version") != DIFF_FILE_VERSION:
+                    raise ValueError(f"{path} is not a version {DIFF_FILE_VERSION} diff file")
+                header = record
+                continue
+
+            if kind == "blob":
+                blobs[record["hash"]] = record["data"]
+                continue
+
+            if kind != "change":
+                raise ValueError(f"Unknown record kind {kind} on line {line_number} of {path}")
+
+            source_attrs = dest_attrs = None
+            if record["action"] in ("create", "update"):
+                source_attrs = _resolve_blobs(record.get("+", {}), blobs)
+            if record["action"] in ("update", "delete"):
+                dest_attrs = _resolve_blobs(record.get("-", {}), blobs)
+            if record["action"] is None:
+                source_attrs, dest_attrs = {}, {}
+
+            element = DiffElement(
+                record["type"],
+                record["name"],
+                record["keys"],
+                source_name=header.get("source") or "source",
+                dest_name=header.get("destination") or "dest",
+                diff_class=diff_class,
+            )
+            element.add_attrs(source=source_attrs, dest=dest_attrs)
+
+            parent = record.get("parent")
+            if parent:
+                elements[(parent["type"], parent["name"])].child_diff.add(element)
+            else:
+                diff.add(element)
+            elements[(record["type"], record["name"])] = element
+
+            if record.get("id") is not None:
+                existing.append({**record, "-": dest_attrs or {}})
+
+    if header is None:
+        raise ValueError(f"{path} is empty")
+
+    diff.models_processed = header.get("models_processed", 0)
+
+    return DiffFile(header, diff, existing)
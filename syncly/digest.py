@@ -0,0 +1,69 @@
+"""
+Content digests of loaded DiffSync models.
+
+A digest covers the identifiers and attributes of a model and, recursively, the digests
+of all its children. Two models with the same digest are identical including their whole
+subtree, which lets the diff skip them with a single comparison instead of walking every
+child attribute (including the base64 `source` of photos).
+"""
+
+import hashlib
+import json
+from typing import Dict, Optional, Tuple
+
+from diffsync import Adapter, DiffSyncModel
+
+DigestKey = Tuple[str, str]
+
+
+def digest_key(obj: DiffSyncModel) -> DigestKey:
+    """Key of a model in a digest mapping."""
+    return (obj.get_type(), obj.get_unique_id())
+
+
+def compute_digests(adapter: Adapter) -> Dict[DigestKey, str]:
+    """
+    Compute the content digest of every model reachable from the adapter's top level.
+
+    Returns:
+        Dict: Mapping of (model type, unique id) to a hex digest.
+    """
+    digests: Dict[DigestKey, str] = {}
+
+    def visit(obj: DiffSyncModel) -> str:
+        key = digest_key(obj)
+        if key in digests:
+            return digests[key]
+
+        content = hashlib.sha1()
+        content.update(
+            json.dumps(
+                [key, obj.get_identifiers(), obj.get_attrs()],
+                sort_keys=True,
+                default=str,
+            ).encode("utf-8")
+        )
+
+        for child_type, child_field in sorted(obj.get_children_mapping().items()):
+            children = adapter.get_by_uids(getattr(obj, child_field), child_type)
+            content.update(child_type.encode("utf-8"))
+            for child_digest in sorted(visit(child) for child in children):
+                content.update(child_digest.encode("utf-8"))
+
+        digests[key] = content.hexdigest()
+        return digests[key]
+
+    for obj_type in adapter.top_level:
+        for obj in adapter.get_all(obj_type):
+            visit(obj)
+
+    return digests
+
+
+def get_digest(adapter: Adapter, obj: DiffSyncModel) -> Optional[str]:
+    """Get the digest of a model, or None when its adapter has no digests computed."""
+    digests: Optional[Dict[DigestKey, str]] = getattr(adapter, "digests", None)
+    if not digests:
+        return None
+
+    return digests.get(digest_key(obj))
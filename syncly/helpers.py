@@ -1,14 +1,18 @@
+import argparse
 import base64
+import csv
 from pydantic.types import AnyType
 import requests
 import io
 import pandas as pd
+import openpyxl
 import os
+import zlib
 import logging
 
 from io import BytesIO, StringIO
 from PIL import Image, ImageOps
-from typing import List, Any, Optional, Callable, Tuple
+from typing import List, Any, Iterator, Optional, Callable, Sequence, Tuple
 from pydantic import ValidationError
 
 logger = logging.getLogger(__name__)
@@ -163,6 +167,81 @@ def xlsx_bytes_to_list(
         return df.values.tolist()
 
 
+def _xlsx_cell_value(value: Any) -> Any:
+    """Convert a cell value like `xlsx_bytes_to_list` does through pandas."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if value == "None":
+        return None
+    return value
+
+
+def iter_xlsx_rows(
+    path: str | os.PathLike,
+    columns: Optional[Sequence[int]] = None,
+    sheet: str | int = 0,
+    include_header: bool = True,
+) -> Iterator[List[Any]]:
+    """
+    Lazily read the rows of an Excel file on disk.
+
+    The sheet is streamed in read-only mode, so memory use does not grow with the
+    number of rows. Values are converted the same way as `xlsx_bytes_to_list`, rows
+    without any value in the selected columns are skipped.
+
+    Args:
+        path: Path of the Excel file.
+        columns: Indexes of the columns to return, all columns when not given.
+        sheet: Name or index of the sheet.
+        include_header: Also yield the first row.
+
+    Returns:
+        An iterator of lists, each with the values of the selected columns of a row.
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if isinstance(sheet, str) else workbook.worksheets[sheet]
+        # The stored dimensions can't be trusted for every generator, read what is there
+        worksheet.reset_dimensions()
+
+        rows = worksheet.iter_rows(values_only=True)
+        if not include_header:
+            next(rows, None)
+
+        for row in rows:
+            if columns is not None:
+                row = tuple(row[i] if i < len(row) else None for i in columns)
+            if all(value is None for value in row):
+                continue
+            yield [_xlsx_cell_value(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def iter_csv_rows(
+    path: str | os.PathLike,
+    include_header: bool = True,
+    encoding: str = "utf-8",
+    seperator: str = ",",
+) -> Iterator[List[str]]:
+    """
+    Lazily read the rows of a CSV file on disk, as text.
+
+    Returns:
+        An iterator of lists where each inner list is a row.
+    """
+    with open(path, "r", encoding=encoding, newline="") as f:
+        rows = csv.reader(f, delimiter=seperator)
+        if not include_header:
+            next(rows, None)
+
+        for row in rows:
+            if row:
+                yield row
+
+
 def csv_bytes_to_list(
     data: bytes,
     include_header: bool = True,
@@ -253,6 +332,51 @@ def to_float(value: str) -> float:
     return float(value)
 
 
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    Parse a shard definition like `3/8` into a (index, count) tuple.
+
+    The index is 1-based, so `1/8` up to `8/8` together cover everything. Used as an
+    argparse `type`, so errors are raised as ArgumentTypeError to show their message.
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Shard `{value}` should be defined as <index>/<count>, e.g. 3/8"
+        )
+
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Shard `{value}` index should be between 1 and {count}")
+
+    return index, count
+
+
+def in_shard(key: str, shard: Optional[Tuple[int, int]]) -> bool:
+    """
+    Check if a key falls in the given shard.
+
+    Uses crc32 instead of hash() so the same key lands in the same shard across processes.
+    """
+    if not shard:
+        return True
+
+    index, count = shard
+    return zlib.crc32(key.encode("utf-8")) % count == index - 1
+
+
+# Same signature as the diffsync callbacks: (stage, current, total), total is 0 when unknown
+ProgressCallback = Callable[[str, int, int], None]
+
+
+def report_progress(
+    callback: Optional[ProgressCallback], stage: str, current: int = 0, total: int = 0
+) -> None:
+    """Call a progress callback if one is set."""
+    if callback:
+        callback(stage, current, total)
+
+
 def pretty_validation_error(err: ValidationError) -> None:
     logger.error("Validation failed with the following errors:")
     for e in err.errors():
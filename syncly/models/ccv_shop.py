@@ -220,22 +220,16 @@ class CCVAttributeValueToProduct(AttributeValueToProduct):
             )
             raise ObjectNotCreated(e)
 
-        try:
-            attribute_value = cast(
-                CCVAttributeValue,
-                adapter.get(
-                    CCVAttributeValue, {"attribute": attribute, "value": value}
-                ),
-            )
-        except ObjectNotFound as e:
+        attribute_value = adapter.get_attribute_value(attribute, value)
+        if not attribute_value:
             logger.warning(f"Attribute value '{value}' not found for attribute '{attribute}', attempting to create it...")
 
-            try:
-                # Get the attribute object to extract its ID
-                attr_obj = cast(
-                    CCVAttribute, adapter.get(CCVAttribute, {"name": attribute})
-                )
+            attr_obj = adapter.get_attribute(attribute)
+            if not attr_obj:
+                logger.error(f"Could not find attribute '{attribute}' to create value '{value}'")
+                raise ObjectNotCreated(f"Attribute '{attribute}' not found")
 
+            try:
                 # Create the attribute value in CCV Shop via API
                 value_body = {
                     "name": value,
@@ -245,28 +239,19 @@ class CCVAttributeValueToProduct(AttributeValueToProduct):
                 result = adapter.conn.attributes.crate_attribute_value(
                     str(attr_obj.id), value_body
                 )
-
-                if not result.data or not result.data.get("id"):
-                    logger.error(f"API returned no data when creating attribute value '{value}'")
-                    raise ObjectNotCreated(e)
-
-                # Load the newly created attribute value into the adapter
-                attribute_value, _ = cast(
-                    tuple[CCVAttributeValue, bool],
-                    adapter.get_or_instantiate(
-                        CCVAttributeValue,
-                        {"attribute": attribute, "value": value},
-                        {"id": result.data.get("id")}
-                    )
-                )
-                logger.info(f"Successfully created and loaded attribute value '{value}' with ID {attribute_value.id}")
-
-            except ObjectNotFound as attr_not_found:
-                logger.error(f"Could not find attribute '{attribute}' to create value '{value}': {attr_not_found}")
-                raise ObjectNotCreated(e)
             except Exception as create_error:
                 logger.error(f"Failed to create attribute value '{value}' for attribute '{attribute}': {create_error}")
-                raise ObjectNotCreated(e)
+                raise ObjectNotCreated(create_error)
+
+            if not result.data or not result.data.get("id"):
+                logger.error(f"API returned no data when creating attribute value '{value}'")
+                raise ObjectNotCreated(f"No id returned for attribute value '{value}'")
+
+            # Load the newly created attribute value into the adapter
+            attribute_value = adapter.add_attribute_value(
+                attr_obj, value, result.data["id"], created_in_shop=True
+            )
+            logger.info(f"Successfully created and loaded attribute value '{value}' with ID {attribute_value.id}")
 
         attr_to_prod_payload = {
             "optionvalue": attribute_value.id,
@@ -0,0 +1,93 @@
+"""
+Exclusion rules evaluated on the raw values of a supplier row.
+
+Adapters read supplier files as lists of values in a known column order. A `RowFilter`
+checks those values before a row is turned into a ProductRow dict, merged with other data
+or used to create a product, so excluded rows are never materialized. Values compared
+against settings are normalized once when the rule is added, not for every row.
+"""
+
+import logging
+from collections import Counter
+from typing import Any, Callable, Iterable, Iterator, List, Sequence, Tuple
+
+from .helpers import normalize_string
+
+logger = logging.getLogger(__name__)
+
+
+def is_empty(value: Any, strip: bool = False) -> bool:
+    """Check if a raw value is missing, optionally treating blank strings as missing."""
+    if strip and isinstance(value, str):
+        return not value.strip()
+    return not value
+
+
+class RowFilter:
+    def __init__(self, fields: Sequence[str]):
+        """
+        Initialize a row filter.
+
+        Args:
+            fields: Field names in the column order of the rows that will be checked.
+        """
+        self.positions = {field: i for i, field in enumerate(fields)}
+        self.rules: List[Tuple[int, Callable[[Any], bool], str]] = []
+
+        # Number of rows skipped per rule, for the summary after loading
+        self.skipped: Counter = Counter()
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def add(self, field: str, keep: Callable[[Any], bool], reason: str) -> "RowFilter":
+        """
+        Add a rule, rows are skipped when `keep` returns False for the value of `field`.
+
+        Raises:
+            ValueError: When the field is not one of the columns.
+        """
+        if field not in self.positions:
+            raise ValueError(f"Unknown field {field}, expected one of {', '.join(self.positions)}")
+
+        self.rules.append((self.positions[field], keep, reason))
+        return self
+
+    def require(self, field: str, strip: bool = False) -> "RowFilter":
+        """Skip rows without a value for `field`, see `is_empty`."""
+        return self.add(field, lambda value: not is_empty(value, strip), f"without {field}")
+
+    def exclude(
+        self,
+        field: str,
+        values: Iterable[Any],
+        normalize: Callable[[str], str] = normalize_string,
+    ) -> "RowFilter":
+        """Skip rows whose normalized `field` is one of the normalized `values`."""
+        excluded = {normalize(str(value)) for value in values}
+        if not excluded:
+            return self
+
+        return self.add(
+            field, lambda value: normalize(str(value)) not in excluded, f"with excluded {field}"
+        )
+
+    def __call__(self, row: Sequence[Any]) -> bool:
+        """Check if a row passes every rule, counting the first rule it fails."""
+        for position, keep, reason in self.rules:
+            value = row[position] if position < len(row) else None
+            if not keep(value):
+                self.skipped[reason] += 1
+                return False
+        return True
+
+    def filter(self, rows: Iterable[Sequence[Any]]) -> Iterator[Sequence[Any]]:
+        """Lazily yield the rows that pass every rule."""
+        for row in rows:
+            if self(row):
+                yield row
+
+    def log_summary(self, name: str) -> None:
+        """Log how many rows each rule skipped."""
+        for reason, count in self.skipped.items():
+            logger.info(f"{name}: skipped {count} rows {reason}")
@@ -16,6 +16,7 @@ class CcvShop(BaseModel):
     image_height: int = 550
     brand: str = ""
     additional_categories: List[str] = Field(default_factory=list)
+    size_order: List[str] = Field(default_factory=list) # Lettered sizes from small to large
 
     @field_validator("url")
     def validate_url(cls, v):
@@ -32,17 +33,35 @@ class Perfion(BaseModel):
     url: str = ""
     included_categories: List[str] = Field(default_factory=list)
     excluded_products: List[str] = Field(default_factory=list)
+    workers: int = 4 # Pages requested at the same time
+    page_delay: float = 0.5 # Seconds between the start of two page requests
+    connect_timeout: float = 10 # Seconds to wait for a connection
+    read_timeout: float = 60 # Seconds to wait for the next bytes of a response
+    max_attempts: int = 3 # Attempts of a page before giving up
+    retry_backoff: float = 5 # Seconds before the first retry, doubled for every next one
+    features: List[str] = Field(default_factory=list) # Features to request, empty for the ones the adapter reads
+    changed_only_max_age: int = 7 * 24 * 60 * 60 # Seconds a successful run is used as the start of a changed-only run
+    server_timezone: str = "Europe/Amsterdam" # Timezone of the modified dates of the Perfion server
 
 class Mascot(BaseModel):
     availability: str = "" # THe file path to the availabilty csv
     product_data: str = "" # The filePath to the Availiability Product data
     excluded_product_types: List[str] = Field(default_factory=list)
+    excluded_products: List[str] = Field(default_factory=list) # Article numbers to skip
+    only_stocked: bool = False # Skip sizes that are not in stock according to the availability csv
+
+class Cache(BaseModel):
+    enabled: bool = True
+    directory: str = "~/.cache/syncly"
+    reference_ttl: int = 6 * 60 * 60 # Seconds CCV brands, packages, categories and attributes are reused
+    perfion_ttl: int = 0 # Seconds parsed Perfion pages are reused, 0 always queries Perfion
 
 class Settings(BaseModel):
     ccv_shop: CcvShop = Field(default_factory=CcvShop)
     perfion: Perfion = Field(default_factory=Perfion)
     mascot: Mascot = Field(default_factory=Mascot)
     mapping: Mapping = Field(default_factory=Mapping)
+    cache: Cache = Field(default_factory=Cache)
 
     @classmethod
     def from_yaml(cls, path: str) -> "Settings":
@@ -64,6 +83,12 @@ def load_settings(path: str) -> Settings:
     _settings_instance = Settings(**data.get("settings", {}))
     return _settings_instance
 
+def use_settings(settings: Settings) -> Settings:
+    """Make settings the ones returned by `get_settings`."""
+    global _settings_instance
+    _settings_instance = settings
+    return _settings_instance
+
 def get_settings() -> Settings:
     if _settings_instance is None:
         raise RuntimeError("Settings not initialized. Call load_settings() first.")